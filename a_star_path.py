@@ -1,6 +1,9 @@
 import numpy as np
 import heapq
 
+import terrain_graph
+import landmarks
+
 def heuristic(node, goal):
     '''
     Calculates the Manhattan distance heuristic between a node and the goal.
@@ -38,7 +41,98 @@ def get_neighbors(grid, node):
 
     return neighbors
 
-def path_find(grid, start, end):
+class Search:
+    '''
+    Class representing an A* search that can be paused and resumed, so its work can be spread over frames.
+    '''
+
+    def __init__(self, grid, start, end, graph=None, landmarks=None):
+        '''
+        Constructor to initialize a Search object.
+
+        Parameters:
+        - grid: The 2D numpy array representing the grid.
+        - start: A tuple (x, y) representing the start node's coordinates.
+        - end: A tuple (x, y) representing the end node's coordinates.
+        - graph: Optional TerrainGraph for the grid; looked up (and built once) if not given.
+        - landmarks: Optional Landmarks for the grid; if given, the ALT heuristic replaces Manhattan distance.
+        '''
+        if graph is None:
+            graph = terrain_graph.get_graph(grid)
+
+        self.graph = graph
+        self.end = end
+        self.start_id, self.end_id = graph.node_id(start), graph.node_id(end)
+
+        self.distances = [float('inf')] * graph.size  # Initialize all distances to infinity
+        self.distances[self.start_id] = 0  # The distance to the start node is 0
+        self.previous_nodes = {}
+
+        self.heap = [(0, self.start_id)]  # Priority queue for nodes to explore, starting with the start node
+
+        # Landmark heuristic for every node, computed in one vectorized pass for this end node
+        self.h = None if landmarks is None else landmarks.heuristic(self.end_id)
+
+        self.expansions = 0  # Total number of nodes expanded so far
+        self.done = False
+        self.path = None  # Filled in once the search finishes, stays None if there is no path
+
+    def step(self, max_expansions=None):
+        '''
+        Method to continue the search for a limited number of node expansions.
+
+        Parameters:
+        - max_expansions: Maximum number of nodes to expand before pausing (default is None, run to completion)
+
+        Returns:
+        - True if the search has finished, False if it was paused
+        '''
+        # Search over flat node ids and the precomputed edge costs instead of tuples and grid lookups
+        graph = self.graph
+        indptr, indices, weights = graph.indptr_list, graph.indices_list, graph.weights_list
+        cols, end, end_id = graph.cols, self.end, self.end_id
+        distances, previous_nodes, heap, h = self.distances, self.previous_nodes, self.heap, self.h
+
+        expansions = 0
+        while heap:
+            if max_expansions is not None and expansions >= max_expansions:
+                self.expansions += expansions
+                return False
+            expansions += 1
+
+            _, current = heapq.heappop(heap)  # Pop the node with the lowest f_score
+
+            if current == end_id:
+                # Reconstruct the path from end to start by following previous nodes
+                path = []
+                while current in previous_nodes:
+                    path.append(graph.node(current))
+                    current = previous_nodes[current]
+                path.append(graph.node(self.start_id))  # Add the start node
+                self.path = path[::-1]  # Store the path in start to end order
+                break
+
+            # Explore neighbors of the current node through its CSR edge range
+            current_dist = distances[current]
+            for edge in range(indptr[current], indptr[current + 1]):
+                neighbor = indices[edge]
+
+                # Calculate tentative distance to neighbor using the precomputed max(change, 10) cost
+                tentative_dist = current_dist + weights[edge]
+                if tentative_dist < distances[neighbor]:  # Check if a new shorter path is found
+                    distances[neighbor] = tentative_dist
+                    previous_nodes[neighbor] = current
+                    if h is None:
+                        f_score = tentative_dist + heuristic(divmod(neighbor, cols), end)  # Total cost of path to this neighbor
+                    else:
+                        f_score = tentative_dist + h[neighbor]
+                    heapq.heappush(heap, (f_score, neighbor))  # Add neighbor to the priority queue
+
+        self.expansions += expansions
+        self.done = True
+        return True
+
+def path_find(grid, start, end, graph=None, landmarks=None):
     '''
     Finds a path from a start node to an end node in a grid using A* algorithm.
 
@@ -46,44 +140,30 @@ def path_find(grid, start, end):
     - grid: The 2D numpy array representing the grid.
     - start: A tuple (x, y) representing the start node's coordinates.
     - end: A tuple (x, y) representing the end node's coordinates.
+    - graph: Optional TerrainGraph for the grid; looked up (and built once) if not given.
+    - landmarks: Optional Landmarks for the grid; if given, the ALT heuristic replaces Manhattan distance.
 
     Returns:
     - A list of tuples representing the path from start to end, or None if no path exists.
     '''
-    rows, cols = grid.shape
+    search = Search(grid, start, end, graph, landmarks)
+    search.step()
+
+    return search.path  # None if there is no path from start to end
+
+def landmark_path_find(grid, start, end):
+    '''
+    Finds a path with A* using the landmark (ALT) heuristic, precomputing the landmarks once per grid.
 
-    distances = np.full_like(grid, np.inf, dtype=float)  # Initialize all distances to infinity
-    distances[start] = 0  # The distance to the start node is 0
-    previous_nodes = {}
-
-    heap = [(0, start)]  # Priority queue for nodes to explore, starting with the start node
-
-    while heap:
-        _, current = heapq.heappop(heap)  # Pop the node with the lowest f_score
-
-        if current == end:
-            # Reconstruct the path from end to start by following previous nodes
-            path = []
-            while current in previous_nodes:
-                path.append(current)
-                current = previous_nodes[current]
-            path.append(start)  # Add the start node
-            return path[::-1]  # Return the path in start to end order
-
-        # Explore neighbors of the current node
-        for neighbor in get_neighbors(grid, current):
-            change = grid[neighbor] - grid[current]  # Calculate terrain change
-            cost = max(change, 10)  # Cost is the terrain change; if negative, set to 10
-
-            # Calculate tentative distance to neighbor
-            tentative_dist = distances[current] + cost
-            if tentative_dist < distances[neighbor]:  # Check if a new shorter path is found
-                distances[neighbor] = tentative_dist
-                previous_nodes[neighbor] = current
-                f_score = tentative_dist + heuristic(neighbor, end)  # Total cost of path to this neighbor
-                heapq.heappush(heap, (f_score, neighbor))  # Add neighbor to the priority queue
-
-    return None  # Return None if there is no path from start to end
+    Parameters:
+    - grid: The 2D numpy array representing the grid.
+    - start: A tuple (x, y) representing the start node's coordinates.
+    - end: A tuple (x, y) representing the end node's coordinates.
+
+    Returns:
+    - A list of tuples representing the path from start to end, or None if no path exists.
+    '''
+    return path_find(grid, start, end, landmarks=landmarks.get_landmarks(grid))
 
 # Example usage
 if __name__ == '__main__':
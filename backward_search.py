@@ -0,0 +1,250 @@
+import numpy as np
+import heapq
+from collections import OrderedDict
+
+import terrain_graph
+
+class BackwardPlanner:
+    '''
+    Class representing a resumable Dijkstra search that runs backwards from a set of goals.
+
+    The planner keeps its g/rhs values between queries, so asking for a path from a new start only
+    continues the search as far as that start. Many enemies query the same planner from different
+    starts, so the search uses no heuristic (key = min(g, rhs)). Edge costs never change, so nodes
+    only ever get cheaper while the search runs and nothing is repaired; goals can only be added.
+    '''
+
+    def __init__(self, grid, goals, graph=None):
+        '''
+        Constructor to initialize a BackwardPlanner object.
+
+        Parameters:
+        - grid: 2D NumPy array representing the terrain heights
+        - goals: Iterable of (row, col) tuples representing the goal cells
+        - graph: Optional TerrainGraph for the grid; looked up (and built once) if not given
+        '''
+
+        self.grid = grid
+        self.graph = terrain_graph.get_graph(grid) if graph is None else graph
+
+        size = self.graph.size
+        self.g = [float('inf')] * size  # Cost-to-goal settled by the last expansion
+        self.rhs = [float('inf')] * size  # One-step lookahead cost-to-goal
+
+        self.goals = set()
+        self.heap = []
+
+        for goal in goals:
+            self.add_goal(goal)
+
+    def update_vertex(self, node):
+        '''
+        Method to recompute a node's lookahead cost and queue it if it has become inconsistent.
+
+        Parameters:
+        - node: Integer node id
+
+        Returns:
+        - None
+        '''
+
+        graph = self.graph
+        indptr, indices, weights = graph.indptr_list, graph.indices_list, graph.weights_list
+
+        if node not in self.goals:
+            best = float('inf')
+            for edge in range(indptr[node], indptr[node + 1]):
+                neighbor = indices[edge]
+                cost = weights[edge] + self.g[neighbor]
+                if cost < best:
+                    best = cost
+            self.rhs[node] = best
+
+        if self.g[node] != self.rhs[node]:
+            heapq.heappush(self.heap, (min(self.g[node], self.rhs[node]), node))
+
+    def update_predecessors(self, node):
+        '''
+        Method to update every node that can step into the given node.
+
+        Parameters:
+        - node: Integer node id
+
+        Returns:
+        - None
+        '''
+
+        graph = self.graph
+        for edge in range(graph.indptr_list[node], graph.indptr_list[node + 1]):
+            self.update_vertex(graph.indices_list[edge])
+
+    def compute_shortest_path(self, start):
+        '''
+        Method to expand inconsistent nodes until the start node's cost-to-goal is settled.
+
+        Parameters:
+        - start: Integer id of the start node
+
+        Returns:
+        - None
+        (Modifies the g and rhs values)
+        '''
+
+        g, rhs, heap = self.g, self.rhs, self.heap
+
+        while heap:
+            key, node = heap[0]
+
+            # Discard queue entries that no longer describe an inconsistent node
+            if g[node] == rhs[node] or key != min(g[node], rhs[node]):
+                heapq.heappop(heap)
+                continue
+
+            if key >= min(g[start], rhs[start]) and g[start] == rhs[start]:
+                break
+
+            heapq.heappop(heap)
+
+            # The node got cheaper, settle it and tell its predecessors
+            g[node] = rhs[node]
+            self.update_predecessors(node)
+
+    def add_goal(self, goal):
+        '''
+        Method to add a goal cell, from which the search spreads out as starts are queried.
+
+        Parameters:
+        - goal: A tuple (row, col) representing the goal cell
+
+        Returns:
+        - None
+        '''
+
+        node = self.graph.node_id(goal)
+        self.goals.add(node)
+        self.rhs[node] = 0
+        self.update_vertex(node)
+
+    def path_find(self, start):
+        '''
+        Method to find the cheapest path from a start cell to the nearest goal.
+
+        Parameters:
+        - start: A tuple (row, col) representing the start cell
+
+        Returns:
+        - A list of tuples representing the path from start to a goal, or None if no goal is reachable
+        '''
+
+        graph = self.graph
+        indptr, indices, weights = graph.indptr_list, graph.indices_list, graph.weights_list
+
+        current = graph.node_id(start)
+        self.compute_shortest_path(current)
+
+        if self.g[current] == float('inf'):
+            return None
+
+        # Walk downhill through the cost-to-goal values
+        path = [graph.node(current)]
+        while current not in self.goals:
+            best, best_neighbor = float('inf'), None
+            for edge in range(indptr[current], indptr[current + 1]):
+                neighbor = indices[edge]
+                cost = weights[edge] + self.g[neighbor]
+                if cost < best:
+                    best, best_neighbor = cost, neighbor
+
+            # Settle the next node too if it is still waiting in the queue
+            if self.g[best_neighbor] != self.rhs[best_neighbor]:
+                self.compute_shortest_path(best_neighbor)
+
+            current = best_neighbor
+            path.append(graph.node(current))
+
+        return path
+
+class PlannerPool:
+    '''
+    Class holding one BackwardPlanner per goal, so search state is kept for every tower.
+
+    Towers never change the cost of moving between cells, so a planner's search stays valid for as
+    long as its tower stands. When a tower dies its planner is dropped and enemies retarget a tower
+    whose planner has already explored most of the map, so replanning continues an existing search
+    instead of starting over.
+    '''
+
+    def __init__(self, max_planners=64):
+        '''
+        Constructor to initialize a PlannerPool object.
+
+        Parameters:
+        - max_planners: Maximum number of planners kept before the least recently used is dropped (default is 64)
+        '''
+
+        self.max_planners = max_planners
+        self.grid = None
+        self.planners = OrderedDict()  # Map goal to its planner, least recently used first
+        self.version = None
+
+    def path_find(self, grid, start, end):
+        '''
+        Finds a path from a start node to an end node, reusing the end node's search state.
+
+        Parameters:
+        - grid: The 2D numpy array representing the grid.
+        - start: A tuple (row, col) representing the start node's coordinates.
+        - end: A tuple (row, col) representing the end node's coordinates.
+
+        Returns:
+        - A list of tuples representing the path from start to end, or None if no path exists.
+        '''
+
+        if grid is not self.grid:
+            self.grid = grid
+            self.planners.clear()
+
+        end = tuple(end)
+        if end in self.planners:
+            self.planners.move_to_end(end)
+        else:
+            self.planners[end] = BackwardPlanner(grid, [end])
+
+            while len(self.planners) > self.max_planners:
+                self.planners.popitem(last=False)
+
+        return self.planners[end].path_find(start)
+
+    def update(self, towers, version):
+        '''
+        Method to drop the planners of goals that are no longer towers.
+
+        Parameters:
+        - towers: Pygame sprite group containing towers
+        - version: Integer counter that changes whenever towers are placed or removed
+
+        Returns:
+        - None
+        '''
+
+        if version != self.version:
+            goals = {tower.grid_pos for tower in towers}
+            for goal in [goal for goal in self.planners if goal not in goals]:
+                del self.planners[goal]
+            self.version = version
+
+# Example usage
+if __name__ == '__main__':
+    grid = np.array([
+        [90, 0,   0,  0,   5],
+        [90, 90,  0,  90,  5],
+        [5,  90,  0,  90,  5],
+        [5,  90,  90, 90,  5],
+        [5,  5,   5,   5,  5]
+    ])
+
+    planner = BackwardPlanner(grid, [(4, 4)])
+    print(planner.path_find((0, 0)))
+
+    # A second start continues the same search rather than starting over
+    print(planner.path_find((0, 3)))
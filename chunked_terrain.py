@@ -0,0 +1,357 @@
+import numpy as np
+import heapq
+from collections import OrderedDict
+
+import generate_terrain as gt
+import tools
+
+# Seed streams, so corners, edges and chunk interiors never draw from the same random numbers
+CORNER, ROW_EDGE, COLUMN_EDGE, INTERIOR = range(4)
+
+class ChunkedTerrain:
+    '''
+    Class representing a large terrain map that is generated lazily in fixed-size square tiles.
+
+    Every tile is generated with diamond-square from seeds derived from the map seed and the tile's
+    position, so a tile evicted from memory comes back identical when it is next read. Tile corners and
+    edges are generated from their own seeds first and shared by the tiles on either side, so there are
+    no seams. Smoothing reads a halo of neighbouring cells, which makes each tile match the result of
+    smoothing the whole map at once.
+
+    Reads go through indexing like a 2D NumPy array, with either a (row, col) pair or a pair of slices,
+    so the drawing code, the sprites and chunked_terrain.path_find never need the whole map in memory.
+    '''
+
+    def __init__(self, chunks=(8, 8), chunk_power=6, roughness=1, seed=1, smoothing_factor=1,
+                 smoothing_kernel=3, max_raw_chunks=64):
+        '''
+        Constructor to initialize a ChunkedTerrain object.
+
+        Parameters:
+        - chunks: Tuple (rows, cols) giving the size of the map in tiles (default is (8, 8))
+        - chunk_power: Integer, each tile is 2^chunk_power cells square (default is 6)
+        - roughness: Float, controls the roughness of the terrain (default is 1)
+        - seed: Integer, seed every tile's random numbers are derived from (default is 1)
+        - smoothing_factor: Integer, number of times to apply terrain smoothing (default is 1)
+        - smoothing_kernel: Odd integer, side length of the smoothing window (default is 3)
+        - max_raw_chunks: Number of unsmoothed tiles kept for building halos (default is 64)
+        '''
+
+        self.chunks = chunks
+        self.chunk_power = chunk_power
+        self.chunk_size = 2**chunk_power
+        self.roughness = roughness
+        self.seed = seed
+        self.smoothing_factor = smoothing_factor
+        self.smoothing_kernel = smoothing_kernel
+        self.max_raw_chunks = max_raw_chunks
+
+        self.shape = (chunks[0] * self.chunk_size, chunks[1] * self.chunk_size)
+        self.ndim = 2
+
+        # Smoothing spreads each cell this far, so a tile needs this many cells of its neighbours
+        self.halo = min(smoothing_factor * (smoothing_kernel // 2), self.chunk_size)
+
+        self.raw_chunks = OrderedDict()  # Map (chunk row, chunk col) to unsmoothed heights, least recently used first
+        self.tiles = {}  # Map (chunk row, chunk col) to finished gray values
+
+        self.generated = 0  # Number of tiles generated, counting regenerations after eviction
+
+    def rng(self, stream, row, col):
+        '''
+        Method to create the random number generator for one corner, edge or tile interior.
+
+        Parameters:
+        - stream: Integer stream id (CORNER, ROW_EDGE, COLUMN_EDGE or INTERIOR)
+        - row: Integer chunk row of the corner, edge or tile
+        - col: Integer chunk col of the corner, edge or tile
+
+        Returns:
+        - NumPy Generator seeded from the map seed, stream and position
+        '''
+
+        return np.random.default_rng([self.seed, stream, row, col])
+
+    def corner(self, row, col):
+        '''
+        Method to get the height of the tile corner shared by up to four tiles.
+
+        Parameters:
+        - row: Integer chunk row of the corner
+        - col: Integer chunk col of the corner
+
+        Returns:
+        - Float height
+        '''
+
+        return self.rng(CORNER, row, col).uniform(0, 1)
+
+    def raw_chunk(self, row, col):
+        '''
+        Method to get the unsmoothed heights of one tile, generating them if they are not held.
+
+        Parameters:
+        - row: Integer chunk row
+        - col: Integer chunk col
+
+        Returns:
+        - 2D NumPy array of shape (chunk_size + 1, chunk_size + 1), including the edges shared with
+          the tiles below and to the right
+        '''
+
+        key = (row, col)
+        if key in self.raw_chunks:
+            self.raw_chunks.move_to_end(key)
+            return self.raw_chunks[key]
+
+        size, power, roughness = self.chunk_size + 1, self.chunk_power, self.roughness
+        terrain = np.zeros((size, size), dtype=float)
+
+        # Edges belong to the boundary they lie on, so both neighbouring tiles generate the same values
+        top_left, top_right = self.corner(row, col), self.corner(row, col + 1)
+        bottom_left, bottom_right = self.corner(row + 1, col), self.corner(row + 1, col + 1)
+        terrain[0, :] = gt.midpoint_displacement(top_left, top_right, power, self.rng(ROW_EDGE, row, col), roughness)
+        terrain[-1, :] = gt.midpoint_displacement(bottom_left, bottom_right, power, self.rng(ROW_EDGE, row + 1, col), roughness)
+        terrain[:, 0] = gt.midpoint_displacement(top_left, bottom_left, power, self.rng(COLUMN_EDGE, row, col), roughness)
+        terrain[:, -1] = gt.midpoint_displacement(top_right, bottom_right, power, self.rng(COLUMN_EDGE, row, col + 1), roughness)
+
+        gt.diamond_square(terrain, self.rng(INTERIOR, row, col), roughness, fixed_edges=True)
+
+        self.raw_chunks[key] = terrain
+        while len(self.raw_chunks) > self.max_raw_chunks:
+            self.raw_chunks.popitem(last=False)
+
+        return terrain
+
+    def raw_region(self, row_start, row_end, col_start, col_end):
+        '''
+        Method to assemble unsmoothed heights for a block of cells, clamping coordinates outside the map.
+
+        Parameters:
+        - row_start: First row of the block (may be negative)
+        - row_end: One past the last row of the block (may be past the map)
+        - col_start: First col of the block (may be negative)
+        - col_end: One past the last col of the block (may be past the map)
+
+        Returns:
+        - 2D NumPy array of unsmoothed heights
+        '''
+
+        size = self.chunk_size
+        rows = np.clip(np.arange(row_start, row_end), 0, self.shape[0] - 1)
+        cols = np.clip(np.arange(col_start, col_end), 0, self.shape[1] - 1)
+
+        region = np.empty((len(rows), len(cols)), dtype=float)
+        for chunk_row in np.unique(rows // size):
+            row_mask = rows // size == chunk_row
+            for chunk_col in np.unique(cols // size):
+                col_mask = cols // size == chunk_col
+                chunk = self.raw_chunk(int(chunk_row), int(chunk_col))
+                region[np.ix_(row_mask, col_mask)] = chunk[np.ix_(rows[row_mask] % size, cols[col_mask] % size)]
+
+        return region
+
+    def tile(self, row, col):
+        '''
+        Method to get the finished gray values of one tile, generating them if they are not held.
+
+        Parameters:
+        - row: Integer chunk row
+        - col: Integer chunk col
+
+        Returns:
+        - 2D NumPy array of shape (chunk_size, chunk_size)
+        '''
+
+        key = (row, col)
+        if key not in self.tiles:
+            size, halo = self.chunk_size, self.halo
+            top, left = row * size, col * size
+
+            region = self.raw_region(top - halo, top + size + halo, left - halo, left + size + halo)
+
+            # Halo cells beyond the map edge repeat the edge after every pass, like clamp smoothing the whole map
+            rows = np.clip(np.arange(top - halo, top + size + halo), 0, self.shape[0] - 1) - (top - halo)
+            cols = np.clip(np.arange(left - halo, left + size + halo), 0, self.shape[1] - 1) - (left - halo)
+            for _ in range(self.smoothing_factor):
+                region = gt.smooth_terrain(region, kernel_size=self.smoothing_kernel, edge_mode="clamp")[np.ix_(rows, cols)]
+
+            self.tiles[key] = tools.float_array_to_color(region[halo:halo + size, halo:halo + size])
+            self.generated += 1
+
+        return self.tiles[key]
+
+    def __getitem__(self, key):
+        '''
+        Method to read cells like a 2D NumPy array.
+
+        Parameters:
+        - key: Tuple (row, col) of integers for one cell, or a tuple of two slices for a block of cells
+
+        Returns:
+        - Float gray value for one cell, or a 2D NumPy array for a block
+        '''
+
+        row, col = key
+        if isinstance(row, slice) or isinstance(col, slice):
+            rows = range(*(row if isinstance(row, slice) else slice(row, row + 1)).indices(self.shape[0]))
+            cols = range(*(col if isinstance(col, slice) else slice(col, col + 1)).indices(self.shape[1]))
+            block = self.region(rows.start, rows.stop, cols.start, cols.stop)[::rows.step, ::cols.step]
+            return block if isinstance(row, slice) and isinstance(col, slice) else block.ravel()
+
+        row, col = int(row), int(col)
+        if row < 0:
+            row += self.shape[0]
+        if col < 0:
+            col += self.shape[1]
+        if not (0 <= row < self.shape[0] and 0 <= col < self.shape[1]):
+            raise IndexError(f"cell {key} is outside the map of shape {self.shape}")
+
+        size = self.chunk_size
+        return self.tile(row // size, col // size)[row % size, col % size]
+
+    def region(self, row_start, row_end, col_start, col_end):
+        '''
+        Method to assemble finished gray values for a block of cells inside the map.
+
+        Parameters:
+        - row_start: First row of the block
+        - row_end: One past the last row of the block
+        - col_start: First col of the block
+        - col_end: One past the last col of the block
+
+        Returns:
+        - 2D NumPy array of gray values
+        '''
+
+        size = self.chunk_size
+        block = np.empty((max(0, row_end - row_start), max(0, col_end - col_start)), dtype=float)
+
+        for chunk_row in range(row_start // size, (row_end - 1) // size + 1 if row_end > row_start else 0):
+            for chunk_col in range(col_start // size, (col_end - 1) // size + 1 if col_end > col_start else 0):
+                top, left = chunk_row * size, chunk_col * size
+                rows = slice(max(row_start, top), min(row_end, top + size))
+                cols = slice(max(col_start, left), min(col_end, left + size))
+                block[rows.start - row_start:rows.stop - row_start, cols.start - col_start:cols.stop - col_start] = \
+                    self.tile(chunk_row, chunk_col)[rows.start - top:rows.stop - top, cols.start - left:cols.stop - left]
+
+        return block
+
+    def __array__(self, dtype=None, copy=None):
+        '''
+        Method to convert the whole map to a dense NumPy array, generating every tile.
+
+        Parameters:
+        - dtype: Optional dtype of the returned array (default is None)
+        - copy: Accepted for NumPy compatibility; a new array is always returned
+
+        Returns:
+        - 2D NumPy array of gray values
+        '''
+
+        block = self.region(0, self.shape[0], 0, self.shape[1])
+        return block if dtype is None else block.astype(dtype)
+
+    def chunk_of(self, cell):
+        '''
+        Method to get the tile containing a cell.
+
+        Parameters:
+        - cell: A tuple (row, col)
+
+        Returns:
+        - A tuple (chunk row, chunk col)
+        '''
+
+        return int(cell[0]) // self.chunk_size, int(cell[1]) // self.chunk_size
+
+    def retain(self, row_range, col_range, paths=()):
+        '''
+        Method to evict every tile outside the given cell range and not on any of the given paths.
+
+        Parameters:
+        - row_range: Tuple (first row, one past the last row) that must stay loaded, e.g. the visible rows
+        - col_range: Tuple (first col, one past the last col) that must stay loaded
+        - paths: Iterable of paths (lists of (row, col) tuples) whose tiles must stay loaded (default is ())
+
+        Returns:
+        - Number of tiles evicted
+        '''
+
+        size = self.chunk_size
+        keep = {(chunk_row, chunk_col)
+                for chunk_row in range(row_range[0] // size, (row_range[1] - 1) // size + 1)
+                for chunk_col in range(col_range[0] // size, (col_range[1] - 1) // size + 1)}
+        for path in paths:
+            keep.update(self.chunk_of(cell) for cell in path)
+
+        evicted = [key for key in self.tiles if key not in keep]
+        for key in evicted:
+            del self.tiles[key]
+
+        return len(evicted)
+
+def path_find(terrain, start, end):
+    '''
+    Finds the shortest path on a ChunkedTerrain with A*, reading heights through its tile accessor.
+
+    Only the tiles the search reaches are generated, so paths can be found on maps far too large to
+    hold in memory at once. For the same reason it keeps its distances in dictionaries rather than
+    using a_star_path.Search, whose edge-cost graph and per-search lists cover every cell of the map.
+
+    Parameters:
+    - terrain: ChunkedTerrain (or any 2D array-like) holding the terrain heights.
+    - start: A tuple (row, col) representing the start node's coordinates.
+    - end: A tuple (row, col) representing the end node's coordinates.
+
+    Returns:
+    - A list of tuples representing the path from start to end, or None if no path exists.
+    '''
+
+    rows, cols = terrain.shape
+    start, end = (int(start[0]), int(start[1])), (int(end[0]), int(end[1]))
+    end_row, end_col = end
+
+    heights = {}  # Heights read so far, so each cell goes through the accessor once
+
+    def height(node):
+        if node not in heights:
+            heights[node] = float(terrain[node])
+        return heights[node]
+
+    distances = {start: 0}
+    previous_nodes = {}
+    # Each step costs at least 10, so 10 * Manhattan distance never overestimates
+    heap = [(10 * (abs(start[0] - end_row) + abs(start[1] - end_col)), 0, start)]
+
+    while heap:
+        _, dist, current = heapq.heappop(heap)
+        if current == end:
+            path = [end]
+            while path[-1] != start:
+                path.append(previous_nodes[path[-1]])
+            return path[::-1]
+        if dist > distances[current]:
+            continue  # Skip stale queue entries
+
+        row, col = current
+        for neighbor in ((row + 1, col), (row - 1, col), (row, col + 1), (row, col - 1)):
+            if not (0 <= neighbor[0] < rows and 0 <= neighbor[1] < cols):
+                continue
+
+            tentative_dist = dist + max(height(neighbor) - height(current), 10)
+            if tentative_dist < distances.get(neighbor, float('inf')):
+                distances[neighbor] = tentative_dist
+                previous_nodes[neighbor] = current
+                heuristic = 10 * (abs(neighbor[0] - end_row) + abs(neighbor[1] - end_col))
+                heapq.heappush(heap, (tentative_dist + heuristic, tentative_dist, neighbor))
+
+    return None
+
+# Example usage
+if __name__ == '__main__':
+    terrain = ChunkedTerrain(chunks=(64, 64), chunk_power=6, seed=5)
+    print("Map shape:", terrain.shape)
+
+    path = path_find(terrain, (0, 0), (100, 150))
+    print("Path length:", len(path), "tiles generated:", terrain.generated)
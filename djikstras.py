@@ -1,6 +1,8 @@
 import numpy as np
 import heapq  # Import heapq for priority queue operations
 
+import terrain_graph
+
 def get_neighbors(grid, node):
     """
     Get all valid neighbors of a given node within the grid.
@@ -23,7 +25,7 @@ def get_neighbors(grid, node):
 
     return neighbors
 
-def path_find(grid, start, end):
+def path_find(grid, start, end, graph=None):
     """
     Find the shortest path from start to end node in a grid, considering terrain cost.
     
@@ -31,46 +33,51 @@ def path_find(grid, start, end):
     - grid: 2D numpy array representing the grid with terrain costs.
     - start: Starting node as a tuple (row, col).
     - end: Ending node as a tuple (row, col).
+    - graph: Optional TerrainGraph for the grid; looked up (and built once) if not given.
     
     Returns:
     - A list of nodes (as tuples) representing the shortest path, including start and end.
     """
-    rows, cols = grid.shape
+    if graph is None:
+        graph = terrain_graph.get_graph(grid)
+
+    # Search over flat node ids and the precomputed edge costs instead of tuples and grid lookups
+    indptr, indices, weights = graph.indptr_list, graph.indices_list, graph.weights_list
+    start_id, end_id = graph.node_id(start), graph.node_id(end)
 
-    distances = np.full_like(grid, np.inf, dtype=float)  # Initialize distances to infinity
-    distances[start] = 0  # Distance from start to itself is 0
-    visited = set()  # Track visited nodes to avoid reprocessing
+    distances = [float('inf')] * graph.size  # Initialize distances to infinity
+    distances[start_id] = 0  # Distance from start to itself is 0
+    visited = [False] * graph.size  # Track visited nodes to avoid reprocessing
     previous_nodes = {}  # Map each node to its predecessor on the shortest path
 
     # Priority queue to store nodes by their current known shortest distance
     pq = []
-    heapq.heappush(pq, (0, start))  # Start node with distance 0
+    heapq.heappush(pq, (0, start_id))  # Start node with distance 0
 
     while pq:
         current_dist, current_node = heapq.heappop(pq)  # Node with the smallest distance
 
-        if current_node in visited:
+        if visited[current_node]:
             continue  # Skip nodes that have been visited
-        visited.add(current_node)
+        visited[current_node] = True
 
-        if current_node == end:
+        if current_node == end_id:
             # Path found, reconstruct it from end to start using previous_nodes
             path = []
             while current_node in previous_nodes:
-                path.append(current_node)
+                path.append(graph.node(current_node))
                 current_node = previous_nodes[current_node]
-            path.append(start)
+            path.append(graph.node(start_id))
             return path[::-1]  # Return reversed path, from start to end
 
-        # Explore neighbors
-        for neighbor in get_neighbors(grid, current_node):
-            if neighbor in visited:
+        # Explore neighbors through the node's CSR edge range
+        for edge in range(indptr[current_node], indptr[current_node + 1]):
+            neighbor = indices[edge]
+            if visited[neighbor]:
                 continue  # Skip already visited neighbors
 
-            # Calculate new distance to neighbor considering the terrain cost
-            change = grid[neighbor] - grid[current_node]
-            cost = max(change, 10)  # Cost is the change; if negative, set to 10
-            new_dist = distances[current_node] + cost
+            # Precomputed terrain cost, max(change, 10)
+            new_dist = distances[current_node] + weights[edge]
 
             # Update neighbor's distance and path if a shorter path is found
             if new_dist < distances[neighbor]:
@@ -0,0 +1,257 @@
+import pygame
+import numpy as np
+
+import spatial_hash
+
+# Map enemy names to the type ids kept in the store, so per-type work can be done on whole arrays
+TYPE_IDS = {"Enemy": 0, "Basic": 1, "Runner": 2, "Giant": 3}
+
+# Per-enemy columns held by the store, as (dtype, per-enemy shape, value for a new enemy)
+FIELDS = {
+    "position": (np.float64, (2,), 0),  # (row, col) in cells, fractional while moving between cells
+    "previous": (np.float64, (2,), 0),  # Position before the last tick, drawn from when interpolating
+    "cell": (np.int64, (2,), -1),  # (row, col) of the cell the enemy occupies, -1 until spawned
+    "target": (np.int64, (2,), -1),  # (row, col) of the cell the enemy is moving to
+    "step": (np.float64, (2,), 0),  # (row, col) added to the position each tick while moving
+    "ticks_left": (np.int64, (), 0),  # Ticks of movement left before the target is reached
+    "speed": (np.float64, (), 1),
+    "health": (np.float64, (), 1),
+    "damage_ticks": (np.int64, (), 0),  # Ticks since the enemy last attacked
+    "damage_cooldown": (np.int64, (), 60),  # Ticks between attacks
+    "height": (np.int64, (), 0),  # Height of the occupied cell
+    "type_id": (np.int8, (), 0)
+}
+
+def new_record():
+    '''
+    Creates the per-enemy values of an enemy that is not in a store yet.
+
+    Returns:
+    - Dictionary mapping each field name to a NumPy array holding the enemy's value
+    '''
+
+    return {name: np.full(shape, default, dtype=dtype) for name, (dtype, shape, default) in FIELDS.items()}
+
+class Field:
+    '''
+    Descriptor exposing one value of an enemy's row in its store as an ordinary attribute.
+
+    Enemies that are not in a store, e.g. between being created and added to the enemies group, keep
+    their values in a record of their own, which is copied into the store when they join it.
+    '''
+
+    def __init__(self, name, column=None):
+        '''
+        Constructor to initialize a Field object.
+
+        Parameters:
+        - name: Name of the field in FIELDS
+        - column: Optional index into a field with two values per enemy, e.g. 0 for the row (default is None)
+        '''
+
+        self.name = name
+        self.item = () if column is None else (column,)
+
+    def __get__(self, enemy, owner=None):
+        if enemy is None:
+            return self
+        if enemy.store is None:
+            return enemy.record[self.name][self.item].item()
+        return enemy.store.arrays[self.name][(enemy.index, *self.item)].item()
+
+    def __set__(self, enemy, value):
+        if enemy.store is None:
+            enemy.record[self.name][self.item] = value
+        else:
+            enemy.store.arrays[self.name][(enemy.index, *self.item)] = value
+
+class EnemyStore(pygame.sprite.Group):
+    '''
+    Class representing the enemies group, backed by NumPy arrays with one row per enemy.
+
+    It is still a pygame sprite group, so code iterating over enemies or killing them works as before,
+    but the state that changes every tick lives in arrays that are advanced for every enemy at once.
+    A spatial hash of the enemies' cells answers nearest, radius and exact-cell queries without
+    scanning every enemy; enemies move themselves in it when they change cell.
+    Enemy sprites are thin views onto their row, and Python-level work is only done for the enemies
+    that finished a move or are due to attack on a given tick, less those a flow field leaves standing
+    still. Rows are kept packed: when an enemy leaves, the last row is moved into its place.
+    '''
+
+    def __init__(self, capacity=128, bucket_size=8):
+        '''
+        Constructor to initialize an EnemyStore object.
+
+        Parameters:
+        - capacity: Number of enemies room is made for up front; it doubles whenever it is exceeded (default is 128)
+        - bucket_size: Side length in cells of each bucket of the spatial hash (default is 8)
+        '''
+
+        super().__init__()
+        self.spatial = spatial_hash.SpatialHash(bucket_size)
+
+        self.count = 0  # Number of rows in use
+        self.enemies = []  # Enemy sprite of each row in use
+        self.arrays = {name: np.full((capacity, *shape), default, dtype=dtype)
+                       for name, (dtype, shape, default) in FIELDS.items()}
+
+    def __getattr__(self, name):
+        # Read the arrays as attributes, e.g. store.position, trimmed to the rows in use
+        arrays = self.__dict__.get("arrays")
+        if arrays is not None and name in arrays:
+            return arrays[name][:self.count]
+        raise AttributeError(name)
+
+    def add_internal(self, sprite, layer=None):
+        '''
+        Method called by pygame when an enemy joins the group, moving its values into a new row.
+
+        Parameters:
+        - sprite: Enemy joining the group
+        - layer: Unused, accepted for compatibility with pygame groups
+
+        Returns:
+        - None
+        '''
+
+        if sprite.store is not None:
+            raise ValueError("an enemy can only belong to one store")
+        if sprite.grid_pos is None:
+            raise ValueError("enemies must be spawned before they are added to the store")
+
+        super().add_internal(sprite, layer)
+
+        # Make room, doubling the arrays so adding stays cheap on average
+        capacity = len(self.arrays["position"])
+        if self.count == capacity:
+            for name, array in self.arrays.items():
+                grown = np.full((capacity * 2, *array.shape[1:]), FIELDS[name][2], dtype=array.dtype)
+                grown[:capacity] = array
+                self.arrays[name] = grown
+
+        index = self.count
+        for name, value in sprite.record.items():
+            self.arrays[name][index] = value
+        self.arrays["previous"][index] = self.arrays["position"][index]  # Appear in place rather than slide in
+        self.arrays["type_id"][index] = TYPE_IDS.get(sprite.name, 0)
+
+        sprite.store, sprite.index, sprite.record = self, index, None
+        self.enemies.append(sprite)
+        self.count += 1
+
+        self.spatial.insert(sprite, sprite.grid_pos)
+
+    def remove_internal(self, sprite):
+        '''
+        Method called by pygame when an enemy leaves the group, e.g. when it is killed.
+
+        The enemy keeps a copy of its values, so snipers still holding it as a target can read it.
+
+        Parameters:
+        - sprite: Enemy leaving the group
+
+        Returns:
+        - None
+        '''
+
+        super().remove_internal(sprite)
+        self.spatial.remove(sprite)
+
+        index, last = sprite.index, self.count - 1
+        sprite.record = {name: np.array(array[index]) for name, array in self.arrays.items()}
+        sprite.store = sprite.index = None
+
+        # Move the last row into the freed one
+        if index != last:
+            for array in self.arrays.values():
+                array[index] = array[last]
+            moved = self.enemies[last]
+            moved.index = index
+            self.enemies[index] = moved
+
+        self.enemies.pop()
+        self.count -= 1
+
+    def advance(self):
+        '''
+        Method to move every enemy that is between cells by one tick.
+
+        Returns:
+        - NumPy array of the rows of enemies that have reached their target cell
+        '''
+
+        self.previous[:] = self.position
+        moving = self.ticks_left > 0
+        self.position[moving] += self.step[moving]
+        self.ticks_left[moving] -= 1
+
+        return np.flatnonzero(~moving)
+
+    def simulate(self, cells, towers, tower_grid, path_cache=None, flow_field=None, scheduler=None):
+        '''
+        Method to run one tick of enemy movement and attacks.
+
+        Parameters:
+        - cells: 2D NumPy array representing the grid of cells
+        - towers: Pygame sprite group containing towers
+        - tower_grid: 2D NumPy array representing the tower grid
+        - path_cache: PathCache the enemies search through when there is no flow field or scheduler (default is None)
+        - flow_field: Optional FlowField shared by all enemies (default is None, which searches per enemy)
+        - scheduler: Optional PathScheduler to queue path searches on (default is None)
+
+        Returns:
+        - None
+        (Modifies the enemies' positions and damage cooldowns, and the health of towers they attack)
+        '''
+
+        arrived = self.advance()
+
+        # With a flow field, enemies already settled on a cell it gives no step from, e.g. a tower they are
+        # attacking, have no path or goals queued, so determine_movement would leave them exactly as they are.
+        # They are skipped until the field changes, which keeps ticks cheap once most enemies are attacking
+        if flow_field is not None and len(arrived):
+            cell = self.cell[arrived]
+            settled = (cell == self.target[arrived]).all(axis=1)
+            arrived = arrived[~(settled & (flow_field.next_steps[cell[:, 0], cell[:, 1], 0] < 0))]
+
+        # Enemies that reached their target choose their next step; nothing here removes enemies, so rows stay put
+        for index in arrived:
+            self.enemies[index].determine_movement(cells, towers, path_cache, flow_field, scheduler)
+
+        # Count down every attack cooldown at once, then let the enemies that are due attack
+        due = self.damage_ticks >= self.damage_cooldown
+        self.damage_ticks[:] = np.where(due, 0, self.damage_ticks + 1)
+
+        # The tower grid indexes towers by cell, so enemies standing on no tower are skipped without a lookup
+        due &= tower_grid[self.cell[:, 0], self.cell[:, 1]] != None
+
+        for index in np.flatnonzero(due):
+            self.enemies[index].inflict_damage(towers, self, tower_grid)
+
+    def draw_enemies(self, screen, scale, offset, camera=None, alpha=1):
+        '''
+        Method to draw the enemies, skipping those off screen.
+
+        Enemies are drawn part of the way from where they were before the last logic tick to where they
+        are now, so movement looks smooth when frames are drawn between ticks.
+
+        Parameters:
+        - screen: Pygame display surface
+        - scale: Scaling factor for grid cell size
+        - offset: Tuple containing the (x, y) offset of the grid
+        - camera: Optional viewport.Camera used to skip drawing enemies off screen (default is None)
+        - alpha: Fraction of the way through the next logic tick, from 0 to 1 (default is 1, the current positions)
+
+        Returns:
+        - None
+        '''
+
+        shown_positions = self.previous + (self.position - self.previous) * alpha
+
+        if camera is None:
+            shown = range(self.count)
+        else:
+            shown = np.flatnonzero(camera.can_see_all(shown_positions[:, 0], shown_positions[:, 1]))
+
+        for index in shown:
+            self.enemies[index].draw(screen, scale, offset, tuple(shown_positions[index]))
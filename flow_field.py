@@ -0,0 +1,139 @@
+import numpy as np
+import heapq
+
+import terrain_graph
+
+class FlowField:
+    '''
+    Class representing a shared navigation field that leads every cell towards its nearest tower.
+
+    The field is built with a single reverse Dijkstra search seeded from every goal cell, using the
+    same terrain cost as the pathfinders (max(change, 10)), so any enemy can read its next step in O(1).
+    '''
+
+    def __init__(self, grid):
+        '''
+        Constructor to initialize a FlowField object.
+
+        Parameters:
+        - grid: 2D NumPy array representing the terrain heights
+        '''
+
+        self.grid = grid
+        self.graph = terrain_graph.get_graph(grid)
+        self.version = None
+
+        # Cost of the cheapest route from each cell to any goal, and the cell to step to next
+        self.distances = np.full(grid.shape, np.inf, dtype=float)
+        self.next_steps = np.full(grid.shape + (2,), -1, dtype=int)
+
+    def rebuild(self, goals):
+        '''
+        Method to recompute the distance and next-step arrays for a new set of goals.
+
+        Parameters:
+        - goals: Iterable of (row, col) tuples representing the goal cells
+
+        Returns:
+        - None
+        (Modifies the distances and next_steps arrays)
+        '''
+
+        graph = self.graph
+        indptr, indices, reverse_weights = graph.indptr_list, graph.indices_list, graph.reverse_weights_list
+
+        # Work on flat Python lists during the search, then copy into the arrays in one go
+        distances = [float('inf')] * graph.size
+        next_steps = [-1] * graph.size
+
+        heap = []
+        for goal in goals:
+            goal_id = graph.node_id(goal)
+            distances[goal_id] = 0
+            heap.append((0, goal_id))
+        heapq.heapify(heap)
+
+        while heap:
+            dist, current = heapq.heappop(heap)
+
+            if dist > distances[current]:
+                continue  # Skip stale queue entries
+
+            # Relax the edges leading into the current node, since the search runs from the goals outwards
+            for edge in range(indptr[current], indptr[current + 1]):
+                neighbor = indices[edge]
+                tentative_dist = dist + reverse_weights[edge]  # Cost of stepping neighbor -> current, max(change, 10)
+
+                if tentative_dist < distances[neighbor]:
+                    distances[neighbor] = tentative_dist
+                    next_steps[neighbor] = current
+                    heapq.heappush(heap, (tentative_dist, neighbor))
+
+        self.distances = np.array(distances).reshape(graph.rows, graph.cols)
+
+        next_steps = np.array(next_steps)
+        self.next_steps = np.stack(np.divmod(next_steps, graph.cols), axis=-1).reshape(graph.rows, graph.cols, 2)
+        self.next_steps[next_steps.reshape(graph.rows, graph.cols) < 0] = -1
+
+    def update(self, towers, version):
+        '''
+        Method to rebuild the field only if the tower layout has changed since the last build.
+
+        Parameters:
+        - towers: Pygame sprite group containing towers
+        - version: Integer counter that changes whenever towers are placed or removed
+
+        Returns:
+        - None
+        '''
+
+        if version != self.version:
+            self.rebuild(tower.grid_pos for tower in towers)
+            self.version = version
+
+    def next_step(self, node):
+        '''
+        Method to look up the next cell to move to from a given cell.
+
+        Parameters:
+        - node: A tuple (row, col) representing the current cell
+
+        Returns:
+        - A tuple (row, col) of the next cell, or None if the cell is a goal or cannot reach one
+        '''
+
+        row, col = self.next_steps[node]
+        if row < 0:
+            return None
+        return int(row), int(col)
+
+    def distance(self, node):
+        '''
+        Method to look up the cost of the cheapest route from a cell to its nearest goal.
+
+        Parameters:
+        - node: A tuple (row, col) representing the cell
+
+        Returns:
+        - The route cost as a float (infinity if no goal is reachable)
+        '''
+
+        return self.distances[node]
+
+# Example usage
+if __name__ == '__main__':
+    grid = np.array([
+        [90, 0,   0,  0,   5],
+        [90, 90,  0,  90,  5],
+        [5,  90,  0,  90,  5],
+        [5,  90,  90, 90,  5],
+        [5,  5,   5,   5,  5]
+    ])
+
+    field = FlowField(grid)
+    field.rebuild([(4, 4)])
+
+    node = (0, 0)
+    while node is not None:
+        print(node)
+        node = field.next_step(node)
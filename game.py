@@ -0,0 +1,244 @@
+import numpy as np
+
+import settings
+import tools
+import sprites
+import a_star_path
+import hpa_star
+import backward_search
+import chunked_terrain
+import flow_field
+import path_scheduler
+import path_workers
+import enemy_store
+import spatial_hash
+import targeting
+from path_cache import PathCache
+
+# Define a class to store game data; each game works on its own instance, starting from these values
+class Game_Data:
+    count = 1  # Counter for game ticks
+    animation_count = 0  # Counter for animation ticks
+    cash = 240  # Player's in-game currency
+    points = 1  # Player's score
+    difficulty = 1  # Difficulty level of the game
+
+# Map tower names to (class, cost, dimensions in cells)
+TOWER_TYPES = {
+    "Wall": (sprites.Wall, 20, (1, 1)),
+    "Sniper": (sprites.Sniper, 120, (1, 1)),
+    "Producer": (sprites.Producer, 240, (1, 1)),
+    "Headquarters": (sprites.Headquarters, 800, (2, 2))
+}
+
+class Game:
+    '''
+    Class representing the state of one game and the logic that advances it, separate from any drawing.
+
+    The game moves forward in fixed ticks of 1 / settings.tick_rate seconds, so it plays the same
+    however fast frames are drawn, and can be run without a window at all.
+    '''
+
+    def __init__(self, grid, map_landmarks=None, data=None, enemy_cap=80):
+        '''
+        Constructor to initialize a Game object, placing the headquarters and the first enemy.
+
+        Parameters:
+        - grid: 2D NumPy array representing the grid of cells
+        - map_landmarks: Optional landmarks for the A* heuristic of the scheduled searches (default is None)
+        - data: Optional instance of the game data class (default is None, a new instance)
+        - enemy_cap: Number of enemies beyond which no more are spawned (default is 80)
+        '''
+
+        # Every other mode builds structures covering the whole map, which a streamed map never holds at once
+        if settings.streaming_terrain and settings.navigation_mode != "path_find":
+            raise ValueError(f"streamed terrain only supports navigation_mode 'path_find', not {settings.navigation_mode!r}")
+
+        self.grid = grid
+        self.data = Game_Data() if data is None else data
+        self.enemy_cap = enemy_cap
+        self.alive = True
+
+        # Initialize tower grid and the sprite groups for towers and enemies. The tower grid is dense, one
+        # pointer per cell, so even on a streamed map it takes 8 bytes per cell of the whole world
+        self.tower_grid = np.full(grid.shape, fill_value=None, dtype=object)
+        self.towers = spatial_hash.SpatialGroup()  # Indexed by cell for finding the closest tower
+        self.enemies = enemy_store.EnemyStore()  # Moves every enemy at once from NumPy arrays
+
+        # Initialize the headquarters tower at the center of the grid
+        width, height = grid.shape
+        self.headquarters = sprites.Headquarters(pos=(height // 2 - 1, width // 2 - 1),
+                                                 cells=grid,
+                                                 tower_grid=self.tower_grid)
+        self.towers.add(self.headquarters)
+
+        # Shared navigation field, rebuilt only when towers are placed or destroyed
+        self.navigation_field = flow_field.FlowField(grid) if settings.navigation_mode == "flow_field" else None
+
+        # Cache in front of the per-enemy searches, chosen here so the navigation mode can be set any time before a game starts
+        self.planners = None
+        if settings.streaming_terrain:
+            search = chunked_terrain.path_find  # Reads heights through the chunk accessor
+        elif settings.navigation_mode == "resumable":
+            self.planners = backward_search.PlannerPool()  # Per-tower backward searches
+            search = self.planners.path_find
+        elif settings.navigation_mode == "hierarchical":
+            search = hpa_star.path_find  # Near-optimal hierarchical search for power 8-9 maps
+        elif settings.landmark_heuristic:
+            search = a_star_path.landmark_path_find
+        else:
+            search = a_star_path.path_find
+        self.path_cache = PathCache(search)
+
+        # Queue for path searches, either worked through a few milliseconds per frame or on worker processes
+        self.scheduler = None
+        if settings.navigation_mode == "scheduled":
+            self.scheduler = path_scheduler.PathScheduler(budget_ms=2, cache=self.path_cache, landmarks=map_landmarks)
+        elif settings.navigation_mode == "workers":
+            self.scheduler = path_workers.PathWorkerPool(grid)
+
+        # Initialize the first basic enemy
+        self.spawn(sprites.Basic, 1)
+
+    @property
+    def elapsed_time(self):
+        '''
+        Simulated time played so far in milliseconds, counted in logic ticks rather than on the clock.
+        '''
+
+        return int((self.data.count - 1) * 1000 / settings.tick_rate)
+
+    def spawn(self, enemy_type, number):
+        '''
+        Method to spawn enemies at random on the grid, up to the enemy cap.
+
+        Parameters:
+        - enemy_type: Enemy class to spawn, e.g. sprites.Basic
+        - number: Number of enemies to spawn
+
+        Returns:
+        - None
+        '''
+
+        for _ in range(number):
+            if len(self.enemies) < self.enemy_cap:
+                enemy = enemy_type(self.data)
+                enemy.spawn(self.grid)
+                self.enemies.add(enemy)
+
+    def can_place(self, name, pos):
+        '''
+        Method to check whether a tower can be afforded and fits at a position.
+
+        Parameters:
+        - name: Tower name in TOWER_TYPES
+        - pos: Tuple (row, col) of the tower's top left cell
+
+        Returns:
+        - Boolean indicating whether the tower can be placed
+        '''
+
+        _, cost, dimensions = TOWER_TYPES[name]
+        return self.data.cash >= cost and tools.can_fit(dimensions=dimensions, pos=pos, tower_grid=self.tower_grid)
+
+    def place_tower(self, name, pos):
+        '''
+        Method to buy and place a tower, if it can be placed.
+
+        Parameters:
+        - name: Tower name in TOWER_TYPES
+        - pos: Tuple (row, col) of the tower's top left cell
+
+        Returns:
+        - Placed tower, or None if it could not be placed
+        '''
+
+        if not self.can_place(name, pos):
+            return None
+
+        tower_type, cost, _ = TOWER_TYPES[name]
+        placed_tower = tower_type(pos=(pos[0], pos[1]), cells=self.grid, tower_grid=self.tower_grid)
+        self.towers.add(placed_tower)
+        self.data.cash -= cost
+
+        # Producers raise the difficulty as well as the income
+        if name == "Producer":
+            self.data.difficulty += 1
+
+        return placed_tower
+
+    def simulate(self):
+        '''
+        Method to advance the game by one logic tick: income, spawning, towers, navigation and enemies.
+
+        Returns:
+        - Boolean indicating whether the player is still alive
+        '''
+
+        if not self.alive:
+            return False
+
+        # Check if the player has lost
+        if not any(tower.name == "Headquarters" for tower in self.towers):
+            self.alive = False
+            return False
+
+        # Update game data and income
+        data = self.data
+        data.count += 1
+        data.points += 0.01 * (data.difficulty / (data.count / 600))
+        data.difficulty += 0.00001
+        base_income = data.difficulty * 0.01
+        data.cash += base_income
+
+        # Spawn enemies based on game difficulty
+        if data.difficulty >= 1 and data.count % 360 == 0:
+            self.spawn(sprites.Basic, int(data.difficulty))
+        if data.difficulty >= 3 and data.count % 400 == 0:
+            self.spawn(sprites.Runner, int(data.difficulty // 2))
+        if data.difficulty >= 5 and data.count % 800 == 0:
+            self.spawn(sprites.Giant, int(data.difficulty // 4))
+
+        # Choose targets for every idle sniper in one batched pass, then run the towers
+        targeting.assign_targets(self.towers, self.enemies, settings.sniper_policy, settings.sniper_range)
+        for tower in self.towers.sprites():
+            tower.simulate(self.enemies, data)
+
+        # Bring the navigation up to date with the towers before enemies choose their next steps
+        if self.navigation_field is not None:
+            self.navigation_field.update(self.towers, sprites.Tower.grid_version)
+        elif settings.navigation_mode == "resumable":
+            self.planners.update(self.towers, sprites.Tower.grid_version)
+        elif settings.navigation_mode == "workers":
+            self.scheduler.update(self.tower_grid, sprites.Tower.grid_version)
+
+        self.enemies.simulate(self.grid, self.towers, self.tower_grid, self.path_cache, self.navigation_field, self.scheduler)
+
+        return True
+
+    def plan_paths(self, max_expansions=None):
+        '''
+        Method to work on the queued path searches of the scheduled mode, once per frame rather than per tick.
+
+        Parameters:
+        - max_expansions: Optional number of node expansions to do instead of spending the scheduler's
+          time budget, so headless games do not depend on machine speed (default is None)
+
+        Returns:
+        - None
+        '''
+
+        if settings.navigation_mode == "scheduled":
+            self.scheduler.run(max_expansions=max_expansions)
+
+    def close(self):
+        '''
+        Method to release what the game holds outside the process, i.e. the pathfinding workers.
+
+        Returns:
+        - None
+        '''
+
+        # Stop the pathfinding workers and release their shared memory
+        if settings.navigation_mode == "workers":
+            self.scheduler.close()
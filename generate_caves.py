@@ -0,0 +1,97 @@
+import numpy as np
+
+# Bump whenever a change alters the caves generated for the same parameters, so stored terrain is regenerated
+GENERATOR_VERSION = 1
+
+def generate_caves(seed: int = 1, resolution: int = 64, adjascents: list = None, fill: float = 0.5,
+                   max_iterations: int = 50, tolerance: int = 0):
+    '''
+    Generates a cave map using a cellular automaton.
+
+    Every iteration a cell becomes a wall when more than four of its neighbours are walls and a floor
+    when fewer than four are, and keeps its state on a tie; cells beyond the map count as walls.
+    Neighbour counts come from shifted array slices and updates are double buffered, so every cell sees
+    the same generation. Generation stops once no more than tolerance cells change.
+
+    Parameters:
+    - seed: Integer, seed for random number generation.
+    - resolution: Integer, size of the cave interior; the map is resolution + 2 cells square.
+    - adjascents: Optional list of (row, col) positions whose random starting state is kept fixed, for
+      stitching to a neighbouring map; when None the outer border is fixed as wall instead.
+    - fill: Float, chance that each cell starts as a wall (default is 0.5).
+    - max_iterations: Integer, most iterations to run if the map does not settle (default is 50).
+    - tolerance: Integer, the map counts as settled once this many cells or fewer change (default is 0).
+
+    Returns:
+    - Tuple (cells, wall_age): cells is a 2D NumPy uint8 array of 0 (floor) and 1 (wall), and wall_age
+      counts how many iterations each cell spent as wall.
+    '''
+
+    rng = np.random.default_rng(seed)
+    size = resolution + 2
+
+    # Two buffers with a ring of wall around the map, so neighbour sums at the edge need no special case
+    current = np.ones((size + 2, size + 2), dtype=np.uint8)
+    spare = current.copy()
+    cells = current[1:-1, 1:-1]
+    cells[...] = rng.random((size, size)) < fill
+
+    fixed = np.zeros((size, size), dtype=bool)
+    if adjascents is None:
+        fixed[[0, -1], :] = fixed[:, [0, -1]] = True
+        cells[fixed] = 1
+    else:
+        for position in adjascents:
+            fixed[position] = True
+    fixed_values = cells[fixed]
+
+    wall_age = cells.astype(np.int32)
+
+    for _ in range(max_iterations):
+        # 3x3 wall counts from shifted slices, summed along the rows and then the columns. Counting the
+        # cell itself folds the tie rule in: more than four neighbours, or four and already a wall
+        row_sums = current[:-2, :] + current[1:-1, :] + current[2:, :]
+        walls = row_sums[:, :-2] + row_sums[:, 1:-1] + row_sums[:, 2:]
+
+        # Write the next generation into the spare buffer, then swap the two
+        next_cells = spare[1:-1, 1:-1]
+        np.greater_equal(walls, 5, out=next_cells, casting="unsafe")
+        next_cells[fixed] = fixed_values
+
+        changed = np.count_nonzero(next_cells != cells)
+        current, spare = spare, current
+        cells = next_cells
+        wall_age += cells
+
+        if changed <= tolerance:
+            break
+
+    return cells.copy(), wall_age
+
+def cave_terrain(seed=1, resolution=61, fill=0.5, max_iterations=50):
+    '''
+    Generates a cave map as terrain heights, so it can be drawn and searched like generate_terrain output.
+
+    Walls that formed early and stayed are tallest, so the oldest rock is the most expensive to climb.
+
+    Parameters:
+    - seed: Integer, seed for random number generation.
+    - resolution: Integer, size of the cave interior; the map is resolution + 2 cells square (default is 61).
+    - fill: Float, chance that each cell starts as a wall (default is 0.5).
+    - max_iterations: Integer, most iterations to run if the map does not settle (default is 50).
+
+    Returns:
+    - 2D NumPy float array of heights in the range [0, 255].
+    '''
+
+    cells, wall_age = generate_caves(seed=seed, resolution=resolution, fill=fill, max_iterations=max_iterations)
+
+    # Floors sit low and walls rise from 128 to 255 with age
+    heights = np.where(cells == 1, 128 + 127 * wall_age / max(1, wall_age.max()), 32)
+    return np.floor(heights)
+
+# Example usage
+if __name__ == '__main__':
+    cells, _ = generate_caves(seed=3, resolution=40)
+    for row in cells:
+        print("".join("#" if cell else "." for cell in row))
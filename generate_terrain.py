@@ -1,8 +1,12 @@
 import numpy as np
 import pygame
 import tools
+import palette
 
-def generate_terrain(power=6, roughness=1, seed=1, smoothing_factor=1):
+# Bump whenever a change alters the terrain generated for the same parameters, so stored terrain is regenerated
+GENERATOR_VERSION = 3
+
+def generate_terrain(power=6, roughness=1, seed=1, smoothing_factor=1, smoothing_kernel=3, edge_mode="reflect"):
     '''
     Generates a terrain map using the diamond-square algorithm.
 
@@ -11,81 +15,174 @@ def generate_terrain(power=6, roughness=1, seed=1, smoothing_factor=1):
     - roughness: Float, controls the roughness of the terrain.
     - seed: Integer, seed for random number generation.
     - smoothing_factor: Integer, number of times to apply terrain smoothing.
+    - smoothing_kernel: Odd integer, side length of the smoothing window (default is 3).
+    - edge_mode: String, how smoothing treats the map edges: "reflect", "clamp" or "wrap" (default is "reflect").
 
     Returns:
     - 2D NumPy array representing the generated terrain.
     '''
 
     size = 2**power + 1
-    np.random.seed(seed)
+    rng = np.random.RandomState(seed)  # The legacy generator, so a seed gives the same map as before
 
     terrain = np.zeros((size, size), dtype=float)
-    corners = [(0, 0), (0, size - 1), (size - 1, 0), (size - 1, size - 1)]
-    for corner in corners:
-        terrain[corner] = np.random.uniform(0, 1)
+    terrain[::size - 1, ::size - 1] = rng.uniform(0, 1, (2, 2))  # Corners
 
-    step = size - 1
-    while step > 1:
-        half = step // 2
-        for y in range(0, size - 1, step):
-            for x in range(0, size - 1, step):
-                average = (
-                    terrain[y, x]
-                    + terrain[y + step, x]
-                    + terrain[y, x + step]
-                    + terrain[y + step, x + step]
-                ) / 4.0
-                terrain[y + half, x + half] = average + np.random.uniform(-roughness, roughness)
-
-        for y in range(0, size - 1, step):
-            for x in range(0, size - 1, step):
-                left = terrain[y + half, x]
-                right = terrain[y + half, x + step]
-                top = terrain[y, x + half]
-                bottom = terrain[y + step, x + half]
-
-                terrain[y + half, x] = (terrain[y, x] + terrain[y + step, x] + top + left) / 4.0 + np.random.uniform(
-                    -roughness, roughness
-                )
-                terrain[y + half, x + step] = (
-                    terrain[y, x + step] + terrain[y + step, x + step] + top + right
-                ) / 4.0 + np.random.uniform(-roughness, roughness)
-                terrain[y, x + half] = (terrain[y, x] + terrain[y, x + step] + top + left) / 4.0 + np.random.uniform(
-                    -roughness, roughness
-                )
-                terrain[y + step, x + half] = (
-                    terrain[y + step, x] + terrain[y + step, x + step] + bottom + right
-                ) / 4.0 + np.random.uniform(-roughness, roughness)
-        step = half
+    diamond_square(terrain, rng, roughness)
 
     # Apply smoothing
-    for _ in range(smoothing_factor):
-        terrain = smooth_terrain(terrain)
+    terrain = smooth_terrain(terrain, iterations=smoothing_factor, kernel_size=smoothing_kernel, edge_mode=edge_mode)
 
     # Trim the sides
     terrain = terrain[1:-1, 1:-1]
 
-    for row, col in np.ndindex(terrain.shape):
-        terrain[row, col] = tools.float_to_color(terrain[row, col])
+    return tools.float_array_to_color(terrain)
+
+def diamond_square(terrain, rng, roughness, fixed_edges=False):
+    '''
+    Fills a square terrain array in place using the diamond-square algorithm.
+
+    Each step level is processed as whole strided slices of the array. The square step fills every
+    square centre at once. The diamond step fills every edge midpoint, averaging the two corners of
+    its edge with two of the square's edge midpoints as they stood when the square was reached in
+    row-major order, i.e. zero where they had not been set yet. This keeps the heights drifting
+    towards zero as the original per-square loop did; the only dependency between squares, the
+    right midpoint becoming the next square's left, is resolved with one shifted slice.
+
+    Parameters:
+    - terrain: 2D NumPy array of shape (2^n + 1, 2^n + 1) with its corners already set.
+    - rng: NumPy Generator or RandomState to draw the random offsets from.
+    - roughness: Float, controls the roughness of the terrain.
+    - fixed_edges: Boolean indicating whether the outer rows and columns are already set and must be kept,
+      so neighbouring arrays that share those edges line up exactly (default is False).
+
+    Returns:
+    - None
+    (Modifies the terrain)
+    '''
+
+    edges = None
+    if fixed_edges:
+        edges = (terrain[0, :].copy(), terrain[-1, :].copy(), terrain[:, 0].copy(), terrain[:, -1].copy())
+
+    step = terrain.shape[0] - 1
+    while step > 1:
+        half = step // 2
+        squares = (terrain.shape[0] - 1) // step
+
+        # Offsets are drawn in the order the per-square loop drew them, centres first
+        centre_offsets = rng.uniform(-roughness, roughness, (squares, squares))
+        left_offsets, right_offsets, top_offsets, bottom_offsets = np.moveaxis(
+            rng.uniform(-roughness, roughness, (squares, squares, 4)), -1, 0)
+
+        # Square step: each square's centre is the mean of its four corners
+        top_left, bottom_left = terrain[0:-1:step, 0:-1:step], terrain[step::step, 0:-1:step]
+        top_right, bottom_right = terrain[0:-1:step, step::step], terrain[step::step, step::step]
+        terrain[half::step, half::step] = (top_left + bottom_left + top_right + bottom_right) / 4.0 + centre_offsets
+
+        # Edge midpoints of each square as they stand before the diamond step
+        top = terrain[0:-1:step, half::step].copy()
+        left = terrain[half::step, 0:-1:step].copy()
+        right = terrain[half::step, step::step].copy()
+        bottom = terrain[step::step, half::step].copy()
+
+        # Bottom midpoints only see unset neighbours; each becomes the top of the square below
+        bottom_values = (bottom_left + bottom_right + bottom + right) / 4.0 + bottom_offsets
+        top[1:] = bottom_values[:-1]
+
+        # Right midpoints, in turn, become the left of the square to the right
+        right_values = (top_right + bottom_right + top + right) / 4.0 + right_offsets
+        left[:, 1:] = right_values[:, :-1]
+
+        # Left and top midpoints overwrite those set from the squares before
+        left_values = (top_left + bottom_left + top + left) / 4.0 + left_offsets
+        top_values = (top_left + top_right + top + left) / 4.0 + top_offsets
 
-    return terrain
+        terrain[half::step, 0:-1:step] = left_values
+        terrain[half::step, -1] = right_values[:, -1]
+        terrain[0:-1:step, half::step] = top_values
+        terrain[-1, half::step] = bottom_values[-1]
 
-def smooth_terrain(terrain):
+        # Put back any edges that were fixed beforehand
+        if edges is not None:
+            terrain[0, :], terrain[-1, :], terrain[:, 0], terrain[:, -1] = edges
+
+        step = half
+
+def midpoint_displacement(start, end, power, rng, roughness):
+    '''
+    Generates a 1D line of heights between two end values by midpoint displacement.
+
+    Each midpoint is a quarter of the sum of its two ends plus an offset, as diamond_square sets the
+    midpoints along the bottom and right of a map, so lines drift towards zero like the map interiors.
+
+    Parameters:
+    - start: Float, height at the start of the line.
+    - end: Float, height at the end of the line.
+    - power: Integer, the line will hold 2^power + 1 heights.
+    - rng: NumPy Generator to draw the random offsets from.
+    - roughness: Float, controls the roughness of the line.
+
+    Returns:
+    - 1D NumPy array of heights.
+    '''
+
+    size = 2**power + 1
+    line = np.zeros(size, dtype=float)
+    line[0], line[-1] = start, end
+
+    step = size - 1
+    while step > 1:
+        half = step // 2
+        line[half::step] = (line[0:-1:step] + line[step::step]) / 4.0 + rng.uniform(-roughness, roughness, (size - 1) // step)
+        step = half
+
+    return line
+
+# Edge modes for smooth_terrain, mapped to the np.pad mode that fills the border
+EDGE_MODES = {
+    "reflect": "reflect",  # Mirror the terrain about its outermost cells
+    "clamp": "edge",  # Repeat the outermost cells
+    "wrap": "wrap"  # Continue from the opposite side, for tiling maps
+}
+
+def smooth_terrain(terrain, iterations=1, kernel_size=3, edge_mode="reflect"):
     '''
-    Applies smoothing to the terrain.
+    Applies box-filter smoothing to the terrain.
+
+    The filter is separable, so each pass sums the window along the rows and then along the columns.
+    Both sums are differences of cumulative sums over a padded copy, so a pass costs the same however
+    large the kernel is, and the window never shrinks at the edges.
 
     Parameters:
     - terrain: 2D NumPy array representing the terrain.
+    - iterations: Integer, number of smoothing passes to apply (default is 1).
+    - kernel_size: Odd integer, side length of the square averaging window (default is 3).
+    - edge_mode: String, how cells beyond the edge are filled: "reflect", "clamp" or "wrap" (default is "reflect").
 
     Returns:
     - 2D NumPy array, the smoothed terrain.
     '''
 
-    # Simple averaging smoothing function
-    smoothed_terrain = terrain.copy()
+    if kernel_size < 1 or kernel_size % 2 == 0:
+        raise ValueError(f"kernel_size must be a positive odd integer, got {kernel_size}")
+    if edge_mode not in EDGE_MODES:
+        raise ValueError(f"edge_mode must be one of {list(EDGE_MODES)}, got {edge_mode!r}")
+
+    radius = kernel_size // 2
+    smoothed_terrain = np.asarray(terrain, dtype=float)
+
+    for _ in range(iterations):
+        padded = np.pad(smoothed_terrain, radius, mode=EDGE_MODES[edge_mode])
+
+        for axis in (0, 1):
+            # Window sums are differences of a cumulative sum that starts from zero
+            sums = np.cumsum(padded, axis=axis)
+            sums = np.concatenate((np.zeros_like(np.take(sums, [0], axis=axis)), sums), axis=axis)
+            length = sums.shape[axis]
+            padded = np.take(sums, range(kernel_size, length), axis=axis) - np.take(sums, range(length - kernel_size), axis=axis)
 
-    for row, col in np.ndindex(terrain.shape):
-        smoothed_terrain[row, col] = np.sum(terrain[row - 1:row + 2, col-1:col+2]) / 9
+        smoothed_terrain = padded / kernel_size**2
 
     return smoothed_terrain
 
@@ -113,8 +210,7 @@ def visualize_terrain(terrain):
 
         for y in range(size):
             for x in range(size):
-                height = tools.change_hue(gray_color=tools.float_to_color(terrain[x, y]),
-                                    new_hue=145)
+                height = palette.color(tools.float_to_color(terrain[x, y]), hue=145)
                 
                 # Ensure color_index stays within the bounds of the colors list
                 pygame.draw.rect(screen, (height), (x * scale, y * scale, scale, scale))
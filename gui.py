@@ -1,5 +1,96 @@
 import pygame
+from collections import OrderedDict
+
 import settings
+import tools
+
+class TextCache:
+    '''
+    Cache class to store rendered text surfaces, so strings repeated between frames are rendered once.
+
+    Attributes:
+    - cache: OrderedDict mapping (font, string, color) to a rendered surface, least recently used first.
+    '''
+
+    def __init__(self, max_entries=256):
+        '''
+        Constructor to initialize a TextCache object.
+
+        Parameters:
+        - max_entries: Number of surfaces kept before the least recently used are dropped (default is 256)
+        '''
+
+        self.max_entries = max_entries
+        self.cache = OrderedDict()
+
+    def render(self, font, string, color=(255, 255, 255)):
+        '''
+        Get a cached text surface or render and cache a new one if not present.
+
+        Parameters:
+        - font: Pygame font to render with
+        - string: Text to render
+        - color: Tuple (r, g, b) text color (default is white)
+
+        Returns:
+        - Pygame Surface of the antialiased text; it is shared, so it must not be drawn on
+        '''
+
+        key = (font, string, color)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return self.cache[key]
+
+        text = font.render(string, True, color)
+        self.cache[key] = text
+        if len(self.cache) > self.max_entries:
+            self.cache.popitem(last=False)
+
+        return text
+
+class Panel:
+    '''
+    Class representing one retained HUD panel, which keeps its surface and only re-renders when its text changes.
+
+    Panels are for text built from live values, such as the cash total, that would otherwise fill the
+    text cache with strings that are never shown again.
+    '''
+
+    def __init__(self):
+        '''
+        Constructor to initialize a Panel object.
+        '''
+
+        self.key = None  # (font, string, color) the surface was rendered from
+        self.surface = None
+
+    def render(self, font, string, color=(255, 255, 255)):
+        '''
+        Method to get the panel's surface, re-rendering it only if the text has changed.
+
+        Parameters:
+        - font: Pygame font to render with
+        - string: Text the panel shows
+        - color: Tuple (r, g, b) text color (default is white)
+
+        Returns:
+        - Pygame Surface of the antialiased text
+        '''
+
+        key = (font, string, color)
+        if key != self.key:
+            self.key = key
+            self.surface = font.render(string, True, color)
+
+        return self.surface
+
+# Shared by every gui function for labels and menu entries
+text_cache = TextCache()
+
+# Retained panels for the HUD text built from live values
+game_stats_panel = Panel()
+tower_stats_panel = Panel()
+personal_stats_panel = Panel()
 
 def display_game_stats(screen, font, elapsed_time, points, difficulty):
     '''
@@ -25,7 +116,7 @@ def display_game_stats(screen, font, elapsed_time, points, difficulty):
     time_str = f"Time: {minutes:02}:{seconds:02}:{milliseconds:03}\n Points: {int(points)}\n Difficulty: {difficulty:.2f}"
 
     # Render the text and position it in the upper right corner
-    text = font.render(time_str, True, (255, 255, 255))
+    text = game_stats_panel.render(font, time_str)
     text_rect = text.get_rect()
     text_rect.topright = (settings.resolution[0] - 20, 20)
     screen.blit(text, text_rect)
@@ -58,8 +149,8 @@ def display_tower_stats(screen, font, tower, parent_rect=None):
     Level: {tower.level}\n\
     Health: {tower.health}/{tower.max_health}"
     
-    # Render and position the tower stats text
-    text = font.render(stats_str, True, (255, 255, 255))
+    # Render and position the tower stats text, re-rendering only when the stats change
+    text = tower_stats_panel.render(font, stats_str)
     text_rect = text.get_rect()
     text_rect.topright = (settings.resolution[0] - 20, y_displacement + 20)
     screen.blit(text, text_rect)
@@ -87,7 +178,7 @@ def display_enemy_stats(screen, font, enemies, parent_rect=None):
 
     # Render and position the "Selected enemies" header
     text_str = "Selected enemies:"
-    text = font.render(text_str, True, (255, 255, 255))
+    text = text_cache.render(font, text_str)
     parent_rect = text_rect = text.get_rect()
     text_rect.topright = (settings.resolution[0] - 20, y_displacement + 20)
     screen.blit(text, text_rect)
@@ -102,7 +193,7 @@ def display_enemy_stats(screen, font, enemies, parent_rect=None):
         Level: {enemy.level}\n\
         Health: {enemy.health}/{enemy.max_health}"
     
-        text = font.render(stats_str, True, (255, 255, 255))
+        text = text_cache.render(font, stats_str)  # Enemies at the same health share one surface
         parent_rect = text_rect = text.get_rect()
         text_rect.topright = (settings.resolution[0] - 20, y_displacement + 20)
         screen.blit(text, text_rect)
@@ -124,9 +215,9 @@ def display_personal_stats(screen, font, cash):
     - Pygame Rect object representing the position of the displayed text
     '''
 
-    # Format and display personal cash stats
+    # Format and display personal cash stats, re-rendering only when the whole-number cash changes
     stats_str = f"Cash: {cash:.0f}"
-    text = font.render(stats_str, True, (255, 255, 255))
+    text = personal_stats_panel.render(font, stats_str)
     text_rect = text.get_rect()
     text_rect.topleft = (20, 20)
     screen.blit(text, text_rect)
@@ -151,9 +242,9 @@ def display_menu(screen, menu, pos, large_font, font):
     # Loop through menu items and render text for each, applying a different style if the item is selected
     for key, value in menu.boolean_dict.items():
         if value:
-            text = large_font.render(key, True, (255, 255, 255))
+            text = text_cache.render(large_font, key)
         else:
-            text = font.render(key, True, (255, 255, 255))
+            text = text_cache.render(font, key)
 
         text_rect = text.get_rect()
         menu_texts.append(text)
@@ -196,7 +287,7 @@ def render_gui(screen,
     # Display pause or death message if the game is paused or the player has died
     if paused or not alive:
         message = "PAUSED" if alive else "YOU DIED"
-        text = large_font.render(message, True, (255, 255, 255))
+        text = text_cache.render(large_font, message)
         text_rect = text.get_rect()
         text_rect.midtop = (settings.resolution[0] // 2, 20)
         screen.blit(text, text_rect)
@@ -224,6 +315,29 @@ def render_gui(screen,
     # Display the tower menu on the left
     display_menu(screen, tower_menu, (20, bottom_rect.bottom + 40), font, small_font)
 
+def display_loading(screen, large_font, elapsed_time):
+    '''
+    Displays the loading screen shown while the terrain is being generated.
+
+    Parameters:
+    - screen: Pygame screen surface
+    - large_font: Pygame font for rendering large text
+    - elapsed_time: Elapsed time in milliseconds, used to animate the dots
+
+    Returns:
+    - None
+    '''
+
+    # Cycle through one to three dots, changing twice a second
+    dots = "." * (1 + elapsed_time // 500 % 3)
+
+    # Left-align the text from a fixed point so it does not shift as the dots change
+    text = text_cache.render(large_font, f"Generating terrain{dots}")
+    text_rect = text.get_rect()
+    text_rect.midleft = (settings.resolution[0] // 2 - large_font.size("Generating terrain...")[0] // 2,
+                         settings.resolution[1] // 2)
+    screen.blit(text, text_rect)
+
 def cursor_place_tower(screen, scale, offset,
                        cursor_xy, tower, small_font,
                        Game_Data, placeable):
@@ -262,8 +376,7 @@ def cursor_place_tower(screen, scale, offset,
     pygame.draw.rect(screen, color, rect, border_radius=3)
 
     if placeable:
-        text = small_font.render(tower, True, (255, 255, 255))
+        text = text_cache.render(small_font, tower)
         text_rect = text.get_rect()
-        text_rect.bottomleft = (offset[0] * scale + cursor_xy[1] * 5 * scale,
-                                offset[1] * scale + cursor_xy[0] * 5 * scale)
+        text_rect.bottomleft = tools.grid_to_screen(*cursor_xy, scale, offset)
         screen.blit(text, text_rect)
@@ -0,0 +1,168 @@
+import os
+import random
+import time
+
+# Run without opening a window; set before pygame is first imported, which happens through settings
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import numpy as np
+
+import settings
+import main
+import game
+
+# Example build order of (tick, tower name, (row, col) relative to the starting headquarters)
+DEFAULT_BUILD_ORDER = [
+    (0, "Sniper", (-2, 0)),
+    (600, "Producer", (0, -2)),
+    (1200, "Sniper", (2, 1)),
+    (1800, "Sniper", (1, 3)),
+    (2400, "Producer", (3, -1)),
+    (3000, "Sniper", (-2, 2)),
+    (3600, "Sniper", (0, 4)),
+    (4200, "Sniper", (-3, -2)),
+    (4800, "Wall", (-1, -1)),
+    (4800, "Wall", (-1, 2)),
+    (4800, "Wall", (2, -1)),
+    (4800, "Wall", (2, 2)),
+    (6000, "Sniper", (4, 3)),
+    (7200, "Sniper", (-4, 3)),
+    (8400, "Sniper", (4, -3)),
+    (9600, "Sniper", (-4, -3))
+]
+
+def run(build_order=DEFAULT_BUILD_ORDER, minutes=30, size=None, sample_every=60, seed=None, terrain=None,
+        expansions_per_tick=1024):
+    '''
+    Plays a game with no window, no drawing and no frame cap, placing towers from a build order.
+
+    Each tower in the build order is bought at the first tick at or after its own on which it can be
+    afforded; later towers wait for it. Towers that do not fit where they are meant to go are skipped.
+    In the scheduled navigation mode, path searches get a fixed number of node expansions per tick
+    rather than a time budget, so a seeded run plays the same on any machine.
+
+    Parameters:
+    - build_order: List of (tick, tower name in game.TOWER_TYPES, (row, col)) sorted by tick, with
+      positions relative to the top left cell of the starting headquarters (default is DEFAULT_BUILD_ORDER)
+    - minutes: Simulated minutes after which the game is stopped if the player is still alive (default is 30)
+    - size: Optional power of two the terrain is generated at (default is None, from settings.selected_difficulty)
+    - sample_every: Ticks between samples of the curves (default is 60, once per simulated second)
+    - seed: Optional seed for where enemies spawn, so runs can be repeated (default is None)
+    - terrain: Optional (grid, colors, landmarks) from main.load_terrain, to reuse a map across runs (default is None)
+    - expansions_per_tick: Node expansions the scheduled path searches get each tick, about what the
+      2 millisecond frame budget allows (default is 1024)
+
+    Returns:
+    - Dictionary with:
+      - "survived": Boolean indicating whether the headquarters lasted the whole game
+      - "survival_time": Simulated seconds until the last headquarters fell, or the whole game if survived
+      - "ticks": Logic ticks simulated
+      - "points", "cash", "difficulty": Final values
+      - "curves": Dictionary of lists sampled every sample_every ticks under "tick", "time", "points",
+        "cash", "difficulty", "enemies" and "towers"
+      - "placed": List of (tick, tower name, (row, col)) of the towers bought
+      - "skipped": List of the build order entries that did not fit
+      - "ticks_per_second": Logic ticks simulated per second of real time
+      - "path_cache": Dictionary of the game's path cache hits, suffix_hits, misses and hit_rate, all zero
+        in the modes that do not search per enemy
+    '''
+
+    if seed is not None:
+        random.seed(seed)
+        np.random.seed(seed)
+
+    if terrain is None:
+        terrain = main.load_terrain(main.map_sizes[settings.selected_difficulty] if size is None else size)
+    grid, _, map_landmarks = terrain
+
+    current_game = game.Game(grid, map_landmarks)
+    data = current_game.data
+    origin = current_game.headquarters.grid_pos
+
+    max_ticks = int(minutes * 60 * settings.tick_rate)
+    pending = list(build_order)
+    placed, skipped = [], []
+    curves = {"tick": [], "time": [], "points": [], "cash": [], "difficulty": [], "enemies": [], "towers": []}
+
+    start_time = time.perf_counter()
+    try:
+        for tick in range(max_ticks):
+            # Buy the next towers in the build order once they are due and affordable
+            while pending and pending[0][0] <= tick:
+                _, name, (row, col) = pending[0]
+                pos = (origin[0] + row, origin[1] + col)
+                if current_game.place_tower(name, pos):
+                    placed.append((tick, name, pos))
+                elif data.cash >= game.TOWER_TYPES[name][1]:
+                    skipped.append(pending[0])  # Affordable, so it did not fit
+                else:
+                    break  # Save up for it
+                pending.pop(0)
+
+            if tick % sample_every == 0:
+                curves["tick"].append(tick)
+                curves["time"].append(tick / settings.tick_rate)
+                curves["points"].append(data.points)
+                curves["cash"].append(data.cash)
+                curves["difficulty"].append(data.difficulty)
+                curves["enemies"].append(len(current_game.enemies))
+                curves["towers"].append(len(current_game.towers))
+
+            if not current_game.simulate():
+                break
+            current_game.plan_paths(max_expansions=expansions_per_tick)
+    finally:
+        current_game.close()
+    elapsed = time.perf_counter() - start_time
+
+    ticks = data.count - 1
+
+    return {
+        "survived": current_game.alive,
+        "survival_time": ticks / settings.tick_rate,
+        "ticks": ticks,
+        "points": data.points,
+        "cash": data.cash,
+        "difficulty": data.difficulty,
+        "curves": curves,
+        "placed": placed,
+        "skipped": skipped,
+        "ticks_per_second": ticks / elapsed if elapsed > 0 else float("inf"),
+        "path_cache": current_game.path_cache.stats()
+    }
+
+def print_report(report, every=60):
+    '''
+    Prints a summary of a headless game and its curves once per simulated minute.
+
+    Parameters:
+    - report: Dictionary returned by run
+    - every: Number of samples between printed rows (default is 60)
+
+    Returns:
+    - None
+    '''
+
+    minutes, seconds = divmod(int(report["survival_time"]), 60)
+    outcome = "Survived" if report["survived"] else "Died after"
+    print(f"{outcome} {minutes:02}:{seconds:02} ({report['ticks']} ticks at {report['ticks_per_second']:.0f} ticks/s)")
+    print(f"Points: {report['points']:.0f}  Cash: {report['cash']:.0f}  Difficulty: {report['difficulty']:.2f}")
+    print(f"Towers placed: {len(report['placed'])}  skipped: {len(report['skipped'])}")
+
+    # Report how much searching the path cache saved, in the modes that search per enemy
+    cache = report["path_cache"]
+    if cache["hits"] + cache["suffix_hits"] + cache["misses"]:
+        print(f"Path cache: {cache['hits']} hits, {cache['suffix_hits']} suffix hits, "
+              f"{cache['misses']} misses ({cache['hit_rate']:.0%} hit rate)")
+
+    curves = report["curves"]
+    print(f"{'Time':>6} {'Points':>8} {'Cash':>8} {'Difficulty':>10} {'Enemies':>7} {'Towers':>6}")
+    for i in range(0, len(curves["tick"]), every):
+        minutes, seconds = divmod(int(curves["time"][i]), 60)
+        print(f"{minutes:03}:{seconds:02} {curves['points'][i]:8.0f} {curves['cash'][i]:8.0f} "
+              f"{curves['difficulty'][i]:10.2f} {curves['enemies'][i]:7} {curves['towers'][i]:6}")
+
+# Play the example build order for 30 simulated minutes and print how it went
+if __name__ == '__main__':
+    print_report(run(seed=0))
@@ -0,0 +1,337 @@
+import numpy as np
+import heapq
+
+import terrain_graph
+
+class HierarchicalGraph:
+    '''
+    Class representing a hierarchical (HPA*) abstraction of the terrain for pathfinding on large maps.
+
+    The grid is split into square clusters. Transition cells are placed along every border between
+    neighbouring clusters, and the abstract graph connects them with inter-cluster edges (a single step
+    across the border) and intra-cluster edges (the cheapest route inside one cluster). Intra-cluster
+    costs are computed the first time a search reaches a cluster, and concrete routes are only refined
+    for the abstract edges that end up on a returned path.
+    '''
+
+    def __init__(self, grid, cluster_size=16, transition_spacing=4, graph=None):
+        '''
+        Constructor to initialize a HierarchicalGraph object.
+
+        Parameters:
+        - grid: 2D NumPy array representing the terrain heights
+        - cluster_size: Side length of each cluster in cells (default is 16)
+        - transition_spacing: Approximate number of cells between transitions on a border (default is 4)
+        - graph: Optional TerrainGraph for the grid; looked up (and built once) if not given
+        '''
+
+        self.grid = grid
+        self.graph = terrain_graph.get_graph(grid) if graph is None else graph
+        self.cluster_size = cluster_size
+        self.transition_spacing = transition_spacing
+
+        self.cluster_nodes = {}  # Map cluster to the abstract node ids inside it
+        self.inter_edges = {}  # Map abstract node id to a list of (neighbor id, cost) across a border
+        self.intra_edges = {}  # Map cluster to {node id: [(neighbor id, cost), ...]} once computed
+        self.refined = {}  # Map (node id, node id) to the concrete route between them once refined
+
+        self.build_transitions()
+
+    def cluster_of(self, node_id):
+        '''
+        Method to get the cluster containing a node.
+
+        Parameters:
+        - node_id: Integer node id
+
+        Returns:
+        - A tuple (cluster row, cluster col)
+        '''
+
+        row, col = divmod(node_id, self.graph.cols)
+        return row // self.cluster_size, col // self.cluster_size
+
+    def add_transition(self, node_a, node_b):
+        '''
+        Method to connect two neighbouring cells on either side of a cluster border.
+
+        Parameters:
+        - node_a: Integer id of the cell on one side of the border
+        - node_b: Integer id of the cell on the other side
+
+        Returns:
+        - None
+        '''
+
+        graph = self.graph
+        for node, neighbor in ((node_a, node_b), (node_b, node_a)):
+            self.cluster_nodes.setdefault(self.cluster_of(node), set()).add(node)
+
+            # Look up the edge cost in the node's CSR range
+            for edge in range(graph.indptr_list[node], graph.indptr_list[node + 1]):
+                if graph.indices_list[edge] == neighbor:
+                    self.inter_edges.setdefault(node, []).append((neighbor, graph.weights_list[edge]))
+
+    def build_transitions(self):
+        '''
+        Method to place transitions along every border between neighbouring clusters.
+
+        Returns:
+        - None
+        (Fills cluster_nodes and inter_edges)
+        '''
+
+        rows, cols = self.graph.rows, self.graph.cols
+        size = self.cluster_size
+
+        for border in range(size, max(rows, cols), size):
+            # Horizontal borders between cluster rows, vertical borders between cluster cols
+            for start in range(0, cols, size):
+                if border < rows:
+                    for col in self.transition_offsets(start, min(start + size, cols)):
+                        self.add_transition((border - 1) * cols + col, border * cols + col)
+            for start in range(0, rows, size):
+                if border < cols:
+                    for row in self.transition_offsets(start, min(start + size, rows)):
+                        self.add_transition(row * cols + border - 1, row * cols + border)
+
+    def transition_offsets(self, start, end):
+        '''
+        Method to spread transitions evenly along one border segment.
+
+        Parameters:
+        - start: First cell index of the segment
+        - end: One past the last cell index of the segment
+
+        Returns:
+        - List of cell indices where transitions are placed
+        '''
+
+        count = max(1, (end - start) // self.transition_spacing)
+        step = (end - start) / count
+        return [start + int(step * (i + 0.5)) for i in range(count)]
+
+    def cluster_search(self, source, cluster, reverse=False, target=None):
+        '''
+        Method to run Dijkstra from a node without leaving its cluster.
+
+        Parameters:
+        - source: Integer id of the node to search from
+        - cluster: Tuple (cluster row, cluster col) the search is restricted to
+        - reverse: Boolean indicating whether to follow edges backwards, giving costs into the source (default is False)
+        - target: Optional integer id to stop at once settled (default is None)
+
+        Returns:
+        - Tuple (distances, previous_nodes) of dictionaries keyed by node id
+        '''
+
+        graph = self.graph
+        indptr, indices, cols, size = graph.indptr_list, graph.indices_list, graph.cols, self.cluster_size
+        weights = graph.reverse_weights_list if reverse else graph.weights_list
+        cluster_row, cluster_col = cluster
+
+        distances = {source: 0}
+        previous_nodes = {}
+        heap = [(0, source)]
+
+        while heap:
+            dist, current = heapq.heappop(heap)
+            if dist > distances[current]:
+                continue
+            if current == target:
+                break
+
+            for edge in range(indptr[current], indptr[current + 1]):
+                neighbor = indices[edge]
+                row, col = divmod(neighbor, cols)
+                if row // size != cluster_row or col // size != cluster_col:
+                    continue  # Stay inside the cluster
+
+                tentative_dist = dist + weights[edge]
+                if tentative_dist < distances.get(neighbor, float('inf')):
+                    distances[neighbor] = tentative_dist
+                    previous_nodes[neighbor] = current
+                    heapq.heappush(heap, (tentative_dist, neighbor))
+
+        return distances, previous_nodes
+
+    def get_intra_edges(self, cluster):
+        '''
+        Method to get the intra-cluster edges of a cluster, computing them the first time.
+
+        Parameters:
+        - cluster: Tuple (cluster row, cluster col)
+
+        Returns:
+        - Dictionary mapping each abstract node in the cluster to a list of (neighbor id, cost)
+        '''
+
+        if cluster not in self.intra_edges:
+            nodes = self.cluster_nodes.get(cluster, set())
+            edges = {}
+            for node in nodes:
+                distances, _ = self.cluster_search(node, cluster)
+                edges[node] = [(other, distances[other]) for other in nodes
+                               if other != node and other in distances]
+            self.intra_edges[cluster] = edges
+
+        return self.intra_edges[cluster]
+
+    def refine(self, node_a, node_b, remember=True):
+        '''
+        Method to get the concrete route between two nodes in the same cluster, refining it once.
+
+        Parameters:
+        - node_a: Integer id of the node to start from
+        - node_b: Integer id of the node to end at
+        - remember: Boolean indicating whether to keep the route for later searches (default is True)
+
+        Returns:
+        - List of node ids from node_a to node_b inclusive
+        '''
+
+        key = (node_a, node_b)
+        if key in self.refined:
+            return self.refined[key]
+
+        _, previous_nodes = self.cluster_search(node_a, self.cluster_of(node_a), target=node_b)
+
+        route = [node_b]
+        while route[-1] != node_a:
+            route.append(previous_nodes[route[-1]])
+        route.reverse()
+
+        if remember:
+            self.refined[key] = route
+        return route
+
+    def path_find(self, start, end):
+        '''
+        Method to find a near-optimal path by searching the abstract graph, then refining its edges.
+
+        Parameters:
+        - start: A tuple (row, col) representing the start cell
+        - end: A tuple (row, col) representing the end cell
+
+        Returns:
+        - A list of tuples representing the path from start to end, or None if no path exists
+        '''
+
+        graph = self.graph
+        cols = graph.cols
+        start_id, end_id = graph.node_id(start), graph.node_id(end)
+        start_cluster, end_cluster = self.cluster_of(start_id), self.cluster_of(end_id)
+
+        # Temporarily connect start and end to the abstract nodes of their clusters
+        start_distances, _ = self.cluster_search(start_id, start_cluster)
+        start_edges = [(node, start_distances[node]) for node in self.cluster_nodes.get(start_cluster, ())
+                       if node in start_distances]
+        end_distances, _ = self.cluster_search(end_id, end_cluster, reverse=True)
+
+        end_row, end_col = end
+        best_cost = float('inf')
+        best_last = None  # Abstract node the best route leaves from to finish inside the end's cluster
+
+        # A route that never leaves the cluster is a candidate when start and end share one
+        if start_cluster == end_cluster and end_id in start_distances:
+            best_cost = start_distances[end_id]
+            best_last = start_id
+
+        # A* over the abstract graph; each step costs at least 10, so 10 * Manhattan is admissible
+        distances = {start_id: 0}
+        previous_nodes = {}
+        heap = [(0, start_id)]
+
+        while heap:
+            f_score, current = heapq.heappop(heap)
+            if f_score >= best_cost:
+                break
+            if f_score > distances[current] + 10 * (abs(current // cols - end_row) + abs(current % cols - end_col)):
+                continue  # Skip stale queue entries
+
+            # Reaching the end's cluster offers a finished route through the end search
+            if current in end_distances:
+                cost = distances[current] + end_distances[current]
+                if cost < best_cost:
+                    best_cost = cost
+                    best_last = current
+
+            if current == start_id:
+                edges = start_edges + self.inter_edges.get(current, [])
+            else:
+                edges = self.get_intra_edges(self.cluster_of(current)).get(current, []) + self.inter_edges.get(current, [])
+
+            for neighbor, cost in edges:
+                tentative_dist = distances[current] + cost
+                if tentative_dist < distances.get(neighbor, float('inf')):
+                    distances[neighbor] = tentative_dist
+                    previous_nodes[neighbor] = current
+                    row, col = divmod(neighbor, cols)
+                    heapq.heappush(heap, (tentative_dist + 10 * (abs(row - end_row) + abs(col - end_col)), neighbor))
+
+        if best_last is None:
+            return None
+
+        # Walk the abstract path back, then refine each edge into concrete cells
+        abstract_path = [best_last]
+        while abstract_path[-1] != start_id:
+            abstract_path.append(previous_nodes[abstract_path[-1]])
+        abstract_path.reverse()
+        if best_last != end_id:
+            abstract_path.append(end_id)
+
+        path = [start_id]
+        for node_a, node_b in zip(abstract_path, abstract_path[1:]):
+            if self.cluster_of(node_a) == self.cluster_of(node_b):
+                # Only routes between abstract nodes are worth keeping; start and end change every query
+                remember = node_a != start_id and node_b != end_id
+                path.extend(self.refine(node_a, node_b, remember)[1:])
+            else:
+                path.append(node_b)  # Inter-cluster edges are a single step
+
+        return [graph.node(node) for node in path]
+
+def get_hierarchy(grid):
+    '''
+    Returns the HierarchicalGraph for a grid, building it only the first time that grid is seen.
+
+    Parameters:
+    - grid: 2D NumPy array representing the terrain heights
+
+    Returns:
+    - HierarchicalGraph built from the grid
+    '''
+
+    return terrain_graph.derived(grid, "hierarchy", lambda: HierarchicalGraph(grid))
+
+def path_find(grid, start, end):
+    '''
+    Finds a near-optimal path from a start node to an end node using hierarchical pathfinding.
+
+    Parameters:
+    - grid: The 2D numpy array representing the grid.
+    - start: A tuple (row, col) representing the start node's coordinates.
+    - end: A tuple (row, col) representing the end node's coordinates.
+
+    Returns:
+    - A list of tuples representing the path from start to end, or None if no path exists.
+    '''
+
+    return get_hierarchy(grid).path_find(start, end)
+
+# Example usage
+if __name__ == '__main__':
+    grid = np.array([
+        [90, 0,   0,  0,   5],
+        [90, 90,  0,  90,  5],
+        [5,  90,  0,  90,  5],
+        [5,  90,  90, 90,  5],
+        [5,  5,   5,   5,  5]
+    ])
+
+    hierarchy = HierarchicalGraph(grid, cluster_size=2, transition_spacing=1)
+    path = hierarchy.path_find((0, 0), (4, 4))
+
+    if path:
+        for node in path:
+            print(node)
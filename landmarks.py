@@ -0,0 +1,139 @@
+import numpy as np
+
+import terrain_graph
+
+def sweep(field, edge_costs):
+    '''
+    Relaxes a distance field along all four grid directions using whole-array sweeps.
+
+    Along one direction, d[i] = min(d[i], d[i - 1] + c[i - 1]) is a running minimum of d - P shifted by P,
+    where P is the prefix sum of the step costs, so a full row or column relaxes in one NumPy call.
+
+    Parameters:
+    - field: 2D NumPy array of distances, relaxed in place
+    - edge_costs: Array of shape (4, rows, cols) with the cost of leaving each cell in each direction
+      (down, up, right, left), infinity where the step would leave the grid
+
+    Returns:
+    - None
+    (Modifies the field)
+    '''
+
+    # (axis, flipped) for down, up, right, left, matching the direction order of the edge costs
+    for direction, (axis, flipped) in enumerate(((0, False), (0, True), (1, False), (1, True))):
+        costs = edge_costs[direction]
+        view = field
+        if flipped:
+            costs = np.flip(costs, axis=axis)
+            view = np.flip(field, axis=axis)
+
+        # Prefix sums of the step costs; the last step along each line leaves the grid and is never taken
+        steps = np.take(costs, range(costs.shape[axis] - 1), axis=axis)
+        prefix = np.concatenate((np.zeros_like(np.take(costs, [0], axis=axis)), np.cumsum(steps, axis=axis)), axis=axis)
+
+        view[...] = np.minimum.accumulate(view - prefix, axis=axis) + prefix
+
+def distance_field(graph, source, reverse=False):
+    '''
+    Computes the cost of the cheapest route from a source cell to every cell (or from every cell to it).
+
+    Parameters:
+    - graph: TerrainGraph to compute distances over
+    - source: Integer node id of the source cell
+    - reverse: Boolean indicating whether to compute costs into the source instead of out of it (default is False)
+
+    Returns:
+    - 1D NumPy array of distances indexed by node id
+    '''
+
+    # Routes into the source are routes out of it on the reversed graph
+    edge_costs = (graph.reverse_costs if reverse else graph.costs).reshape(4, graph.rows, graph.cols)
+
+    field = np.full((graph.rows, graph.cols), np.inf)
+    field.flat[source] = 0
+
+    # Each pass fixes every route that turns at most a few times, so only a handful of passes are needed
+    while True:
+        previous = field.copy()
+        sweep(field, edge_costs)
+        if np.array_equal(field, previous):
+            return field.ravel()
+
+class Landmarks:
+    '''
+    Class holding precomputed landmark distances for the ALT (A*, landmarks, triangle inequality) heuristic.
+
+    For a landmark L the triangle inequality gives two lower bounds on the cost from v to a goal t:
+    d(L, t) - d(L, v) and d(v, L) - d(t, L). The heuristic is the largest bound over all landmarks,
+    combined with 10 * Manhattan distance since every step costs at least 10. It never overestimates,
+    so A* still returns optimal paths while expanding far fewer nodes on hilly terrain.
+    '''
+
+    def __init__(self, grid, count=8, graph=None):
+        '''
+        Constructor to initialize a Landmarks object.
+
+        Parameters:
+        - grid: 2D NumPy array representing the terrain heights
+        - count: Number of landmark cells to place (default is 8)
+        - graph: Optional TerrainGraph for the grid; looked up (and built once) if not given
+        '''
+
+        self.grid = grid
+        self.graph = terrain_graph.get_graph(grid) if graph is None else graph
+
+        self.nodes = []
+        from_landmarks, to_landmarks = [], []
+
+        # Farthest-point placement: start in a corner, then keep adding the cell farthest from every landmark
+        node = 0
+        closest = np.full(self.graph.size, np.inf)
+        for _ in range(min(count, self.graph.size)):
+            self.nodes.append(node)
+            from_landmarks.append(distance_field(self.graph, node))
+            to_landmarks.append(distance_field(self.graph, node, reverse=True))
+
+            closest = np.minimum(closest, from_landmarks[-1] + to_landmarks[-1])
+            node = int(np.argmax(np.where(np.isfinite(closest), closest, -1)))
+
+        self.from_landmarks = np.array(from_landmarks)  # d(L, v) for each landmark L and node v
+        self.to_landmarks = np.array(to_landmarks)  # d(v, L)
+
+        rows, cols = np.divmod(np.arange(self.graph.size), self.graph.cols)
+        self.rows, self.cols = rows, cols
+
+    def heuristic(self, goal):
+        '''
+        Method to compute the heuristic from every node to a goal in one vectorized pass.
+
+        Parameters:
+        - goal: Integer node id of the goal
+
+        Returns:
+        - List of lower bounds on the cost to the goal, indexed by node id
+        '''
+
+        goal_row, goal_col = divmod(goal, self.graph.cols)
+
+        forward = self.from_landmarks[:, [goal]] - self.from_landmarks
+        backward = self.to_landmarks - self.to_landmarks[:, [goal]]
+        bounds = np.maximum(forward, backward).max(axis=0)
+
+        manhattan = 10 * (np.abs(self.rows - goal_row) + np.abs(self.cols - goal_col))
+
+        # Unreachable combinations give inf - inf = nan, which carries no information
+        bounds = np.fmax(bounds, manhattan)
+        return np.where(np.isnan(bounds), manhattan, bounds).tolist()
+
+def get_landmarks(grid):
+    '''
+    Returns the Landmarks for a grid, precomputing them only the first time that grid is seen.
+
+    Parameters:
+    - grid: 2D NumPy array representing the terrain heights
+
+    Returns:
+    - Landmarks computed for the grid
+    '''
+
+    return terrain_graph.derived(grid, "landmarks", lambda: Landmarks(grid))
@@ -1,23 +1,66 @@
 # Import necessary libraries
 import pygame
 import numpy as np
+import os
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 # Import custom modules
 import generate_terrain as gt
 import generate_terrain as gtc  # Repeated import; can be removed
 import settings
 import tools
-import sprites
 import gui
-
-# Define a class to store game data
-class Game_Data:
-    count = 1  # Counter for game ticks
-    animation_count = 0  # Counter for animation ticks
-    cash = 240  # Player's in-game currency
-    points = 1  # Player's score
-    difficulty = 1  # Difficulty level of the game
+import terrain_graph
+import landmarks
+import hpa_star
+import terrain_store
+import chunked_terrain
+import terrain_renderer
+import viewport
+import game
+
+# Map each difficulty to the power of two the terrain is generated at; harder games have smaller maps
+map_sizes = {"easy": 6, "medium": 5, "hard": 4}
+
+# Build the map and everything precomputed from it; runs on a worker thread while the loading screen shows
+def load_terrain(size):
+    # Generate terrain grid, or load it and its edge costs from the terrain cache
+    if settings.terrain_generator == "caves":
+        terrain_params = dict(generator="caves", resolution=2**size - 3, seed=5)  # Same size as the hills
+    else:
+        terrain_params = dict(generator="diamond_square", power=size, roughness=1, seed=5, smoothing_factor=1)
+
+    if settings.streaming_terrain:
+        # Tiles are generated as they are first read, so the map can be far larger than memory allows
+        grid = chunked_terrain.ChunkedTerrain(chunks=settings.world_chunks, chunk_power=settings.chunk_power,
+                                              roughness=1, seed=5, smoothing_factor=1)
+        colors = edge_costs = None
+    elif settings.terrain_cache:
+        store = terrain_store.TerrainStore(os.path.join(os.path.dirname(os.path.abspath(__file__)), settings.terrain_cache_dir),
+                                           max_bytes=settings.terrain_cache_mb * 2**20)
+        terrain = store.get_terrain(**terrain_params)
+        grid, colors = terrain["grid"], terrain["colors"]
+        edge_costs = (terrain["costs"], terrain["reverse_costs"])
+    else:
+        terrain = terrain_store.build_terrain(**terrain_params)
+        grid, colors = terrain["grid"], terrain["colors"]
+        edge_costs = (terrain["costs"], terrain["reverse_costs"])
+
+    # Build the edge-cost graph the pathfinders search over once for this map
+    map_landmarks = None
+    if not settings.streaming_terrain:
+        terrain_graph.get_graph(grid, edge_costs)
+
+        # Only the per-enemy searches use landmarks, so the other modes skip the precomputation
+        if settings.landmark_heuristic and settings.navigation_mode in ("path_find", "scheduled"):
+            map_landmarks = landmarks.get_landmarks(grid)
+
+        # Build the cluster graph of hierarchical search up front rather than on the first enemy's search
+        if settings.navigation_mode == "hierarchical":
+            hpa_star.get_hierarchy(grid)
+
+    return grid, colors, map_landmarks
 
 # Main game function
 def main():
@@ -43,47 +86,52 @@ def main():
     tower_menu = tools.ExclusiveBooleanList(menu_item1, menu_item2, menu_item3, menu_item4)  # Menu for tower selection
 
     # Set grid size based on selected difficulty
-    if settings.selected_difficulty == "easy":
-        size = 6
-    elif settings.selected_difficulty == "medium":
-        size = 5
-    elif settings.selected_difficulty == "hard":
-        size = 4
-
-    # Generate terrain grid
-    grid = gtc.generate_terrain(power=size, roughness=1, seed=5, smoothing_factor=1)
-
-    # Initialize tower grid and other variables
-    tower_grid = np.full_like(grid, fill_value=None, dtype=object)
-    placeable = False  # Flag to check if a tower can be placed
+    size = map_sizes[settings.selected_difficulty]
 
-    # Create Pygame sprite groups for towers and enemies
-    towers_group = pygame.sprite.Group()
-    enemies_group = pygame.sprite.Group()
+    # Build the terrain on a worker thread, keeping the window responsive with a loading screen until it is ready
+    loader = ThreadPoolExecutor(max_workers=1)
+    terrain_future = loader.submit(load_terrain, size)
+    clock = pygame.time.Clock()
 
-    # Set enemy cap for the game
-    enemy_cap = 80
+    while not terrain_future.done():
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                # Closing the window does not stop the worker, so wait for it before quitting
+                loader.shutdown(wait=True)
+                pygame.quit()
+                return
 
-    # Get grid dimensions
-    width, height = grid.shape
+        screen.fill((0, 0, 0))
+        gui.display_loading(screen, large_font, pygame.time.get_ticks())
+        pygame.display.update()
+        clock.tick(30)
 
-    # Initialize the headquarters tower at the center of the grid
-    initial_tower = sprites.Headquarters(pos=(height // 2 - 1, width // 2 - 1),
-                                         cells=grid,
-                                         tower_grid=tower_grid)
-    towers_group.add(initial_tower)
+    loader.shutdown()
+    grid, colors, map_landmarks = terrain_future.result()
+
+    # Terrain is drawn from cached surfaces, re-rendered only when the zoom level changes
+    renderer = terrain_renderer.TerrainRenderer(grid, colors)
+
+    # Set up the game state: towers, enemies, navigation and the headquarters
+    current_game = game.Game(grid, map_landmarks, enemy_cap=80)
+    Game_Data = current_game.data
+    enemies_group = current_game.enemies
+    tower_grid = current_game.tower_grid
+    placeable = False  # Flag to check if a tower can be placed
+
+    # Map menu items to the tower names the game places
+    tower_names = {menu_item1: "Wall", menu_item2: "Sniper", menu_item3: "Producer", menu_item4: "Headquarters"}
 
     # Initialize movement-related variables
     move_keys = {pygame.K_UP: False, pygame.K_DOWN: False, pygame.K_RIGHT: False, pygame.K_LEFT: False,
                  pygame.K_w: False, pygame.K_s: False, pygame.K_d: False, pygame.K_a: False}
     move_speed = 5  # Adjust the movement speed as needed
 
-    clock = pygame.time.Clock()
-
-    # Initialize the first basic enemy
-    enemy = sprites.Basic(Game_Data)
-    enemy.spawn(grid, offset, scale)
-    enemies_group.add(enemy)
+    # Logic runs in fixed ticks; frame time is banked and spent a whole tick at a time
+    tick_ms = 1000 / settings.tick_rate
+    max_frame_ms = 250  # Frame time beyond this is dropped, so a stall slows the game instead of freezing it to catch up
+    accumulator = 0
+    frame_ms = 0
 
     running = True
     paused = False
@@ -91,45 +139,6 @@ def main():
 
     while running:
         Game_Data.animation_count += 1
-        if not paused:
-            # Check if the player has lost
-            hq_count = 0
-            for tower in towers_group:
-                if tower.name == "Headquarters":
-                    hq_count += 1
-            if hq_count == 0:
-                alive = False
-                paused = True
-            else:
-                # Update game data and income
-                elapsed_time = pygame.time.get_ticks()
-                Game_Data.count += 1
-                Game_Data.points += 0.01 * (Game_Data.difficulty / (Game_Data.count / 600))
-                Game_Data.difficulty += 0.00001
-                base_income = Game_Data.difficulty * 0.01
-                Game_Data.cash += base_income
-
-                # Spawn enemies based on game difficulty
-                if Game_Data.difficulty >= 1 and Game_Data.count % 360 == 0:
-                    for _ in range(int(Game_Data.difficulty)):
-                        if len(enemies_group.sprites()) < enemy_cap:
-                            enemy = sprites.Basic(Game_Data)
-                            enemy.spawn(grid, offset, scale)
-                            enemies_group.add(enemy)
-
-                if Game_Data.difficulty >= 3 and Game_Data.count % 400 == 0:
-                    for _ in range(int(Game_Data.difficulty // 2)):
-                        if len(enemies_group.sprites()) < enemy_cap:
-                            enemy = sprites.Runner(Game_Data)
-                            enemy.spawn(grid, offset, scale)
-                            enemies_group.add(enemy)
-
-                if Game_Data.difficulty >= 5 and Game_Data.count % 800 == 0:
-                    for _ in range(int(Game_Data.difficulty // 4)):
-                        if len(enemies_group.sprites()) < enemy_cap:
-                            enemy = sprites.Giant(Game_Data)
-                            enemy.spawn(grid, offset, scale)
-                            enemies_group.add(enemy)
 
         # Handle Pygame events
         for event in pygame.event.get():
@@ -177,31 +186,7 @@ def main():
 
                 # Handle tower placement
                 if placeable and event.button == 1:
-                    if tower == menu_item1 and Game_Data.cash >= 20:
-                        placed_tower = sprites.Wall(pos=(cursor_xy[0], cursor_xy[1]),
-                                                    cells=grid,
-                                                    tower_grid=tower_grid)
-                        towers_group.add(placed_tower)
-                        Game_Data.cash -= 20
-                    if tower == menu_item2 and Game_Data.cash >= 120:
-                        placed_tower = sprites.Sniper(pos=(cursor_xy[0], cursor_xy[1]),
-                                                      cells=grid,
-                                                      tower_grid=tower_grid)
-                        towers_group.add(placed_tower)
-                        Game_Data.cash -= 120
-                    if tower == menu_item3 and Game_Data.cash >= 240:
-                        placed_tower = sprites.Producer(pos=(cursor_xy[0], cursor_xy[1]),
-                                                        cells=grid,
-                                                        tower_grid=tower_grid)
-                        towers_group.add(placed_tower)
-                        Game_Data.difficulty += 1
-                        Game_Data.cash -= 240
-                    if tower == menu_item4 and Game_Data.cash >= 800:
-                        placed_tower = sprites.Headquarters(pos=(cursor_xy[0], cursor_xy[1]),
-                                                            cells=grid,
-                                                            tower_grid=tower_grid)
-                        towers_group.add(placed_tower)
-                        Game_Data.cash -= 800
+                    current_game.place_tower(tower_names[tower], cursor_xy)
 
         # Update continuous movement based on key statesD
         if move_keys[pygame.K_UP] or move_keys[pygame.K_w]:
@@ -231,46 +216,64 @@ def main():
         if not zoom_queue:
             scale = round(scale * 2) / 2
 
+        # Run as many logic ticks as the time since the last frame covers
+        if paused:
+            accumulator = 0
+        else:
+            accumulator += min(frame_ms, max_frame_ms)
+            while accumulator >= tick_ms:
+                accumulator -= tick_ms
+                if not current_game.simulate():
+                    # The player has lost
+                    alive = False
+                    paused = True
+                    accumulator = 0
+                    break
+
+            # Spend the path search budget once per frame, however many ticks ran
+            current_game.plan_paths()
+
+        # How far the game is through the next tick, for drawing enemies between where they were and are
+        alpha = 1 if paused else accumulator / tick_ms
+
         # Fill the screen with black
         screen.fill((0, 0, 0))
-        # Draw the terrain grid
-        tools.draw_grid(screen, grid, scale, offset)
+        # Work out which cells are on screen and under the cursor once, for the terrain, sprites and gui to share
+        camera = viewport.Camera(offset, scale, screen.get_size())
+        row_start, row_end, col_start, col_end = camera.look_at(grid)
+        cursor_xy = camera.cursor
+
+        # Draw the terrain grid, keeping the rendered tiles only once any zoom has settled
+        renderer.draw(screen, scale, offset, cursor_xy, camera.visible, cache=not zoom_queue)
 
-        # Update and draw towers and enemies
-        towers_group.update(screen, scale, offset, small_font, enemies_group, Game_Data, paused)
-        enemies_group.update(screen, grid, towers_group, tower_grid, enemies_group, scale, offset, paused)
+        # Drop streamed tiles that are neither on screen nor on any enemy's remaining path
+        if settings.streaming_terrain and Game_Data.animation_count % 60 == 0:
+            grid.retain((row_start, row_end), (col_start, col_end),
+                        [[enemy.grid_pos, *enemy.goal_queue] for enemy in enemies_group])
 
-        # Get cursor position and check for tower placement
-        cursor_xy = tools.get_cursor_xy(grid, scale, offset, size=5)
+        # Draw the towers and enemies as the logic ticks left them
+        for tower in current_game.towers:
+            tower.render(screen, scale, offset, small_font, Game_Data, camera)
+        enemies_group.draw_enemies(screen, scale, offset, camera, alpha)
+
+        # Check for tower placement under the cursor found above
         hovered_tower = None
         hovered_enemies = []
-        for tower in towers_group:
-            if tower.grid_pos == cursor_xy:
-                hovered_tower = tower
+        if cursor_xy:
+            # The tower grid and the enemies' spatial hash index both by cell, so nothing is scanned
+            cursor_tower = tower_grid[cursor_xy]
+            if cursor_tower is not None and cursor_tower.grid_pos == cursor_xy:
+                hovered_tower = cursor_tower
 
-        for enemy in enemies_group:
-            if tuple(reversed(enemy.hitbox.topleft)) == cursor_xy:
-                hovered_enemies.append(enemy)
+            hovered_enemies = enemies_group.spatial.at(cursor_xy)
 
         # Check tower placement validity and display cursor information
         placeable = False
         if cursor_xy and not tower_menu.none_true():
             tower = tower_menu.return_true()
 
-            if tower != menu_item4:
-                placeable = tools.can_fit(dimensions=(1, 1), pos=cursor_xy, tower_grid=tower_grid)
-            elif tower == menu_item4:
-                placeable = tools.can_fit(dimensions=(2, 2), pos=cursor_xy, tower_grid=tower_grid)
-
-            # Check if player has enough cash for tower placement
-            if tower == menu_item1 and Game_Data.cash < 20:
-                placeable = False
-            if tower == menu_item2 and Game_Data.cash < 120:
-                placeable = False
-            if tower == menu_item3 and Game_Data.cash < 240:
-                placeable = False
-            if tower == menu_item4 and Game_Data.cash < 800:
-                placeable = False
+            # Check the tower fits and the player has enough cash for it
+            placeable = current_game.can_place(tower_names[tower], cursor_xy)
 
             # Display cursor information
             gui.cursor_place_tower(screen, scale, offset, cursor_xy, tower, small_font, Game_Data, placeable)
@@ -279,13 +282,16 @@ def main():
         gui.render_gui(screen,
                        large_font, font, small_font,
                        tower_menu,
-                       paused, alive, elapsed_time, Game_Data,
+                       paused, alive, current_game.elapsed_time, Game_Data,
                        hovered_tower, hovered_enemies)
 
         # Update display
         pygame.display.update()
-        # Limit frame rate to 60 FPS
-        clock.tick(60)
+        # Limit the frame rate, timing the frame for the next frame's logic ticks
+        frame_ms = clock.tick(settings.frame_rate_cap)
+
+    # Stop the pathfinding workers and release their shared memory
+    current_game.close()
 
     # Quit Pygame when the game loop ends
     pygame.quit()
@@ -0,0 +1,126 @@
+import numpy as np
+import colorsys
+
+# Every hue the game draws with: enemies (0, 10, 20), towers (45, 120, 200, 240) and the terrain (145)
+GAME_HUES = (0, 10, 20, 45, 120, 145, 200, 240)
+
+# Desaturation amounts the game uses, e.g. the row and column under the cursor
+GAME_DESATURATIONS = (90,)
+
+def change_hue(gray_color, new_hue):
+    '''
+    Function to change the hue of a gray color.
+
+    Parameters:
+    - gray_color: Integer representing the gray color value (0 to 255)
+    - new_hue: New hue value in degrees (0 to 360)
+
+    Returns:
+    - Tuple containing the RGB color after changing the hue
+    '''
+
+    # Convert HSV to RGB, considering the input gray_color as the value component
+    new_rgb = colorsys.hsv_to_rgb(new_hue / 360, 1, gray_color / 255)
+
+    # Convert the resulting floating-point RGB values back to integers in the range [0, 255]
+    return tuple(int(x * 255) for x in new_rgb)
+
+def desaturate_color(color, amount):
+    '''
+    Function to desaturate an RGB color by a specified amount.
+
+    Parameters:
+    - color: Tuple representing the RGB color to be desaturated
+    - amount: Integer value indicating the amount of desaturation (0 to 255)
+
+    Returns:
+    - Tuple containing the desaturated RGB color
+    '''
+
+    # Ensure the amount is within the valid range of 0 to 255
+    amount = max(0, min(amount, 255))
+
+    # Convert the RGB color to HLS color space
+    r, g, b = color
+    h, l, s = colorsys.rgb_to_hls(r / 255.0, g / 255.0, b / 255.0)
+
+    # Desaturate the color by adjusting its saturation
+    new_s = max(0, s - (amount / 255.0))
+    
+    # Convert the color back to RGB
+    new_r, new_g, new_b = colorsys.hls_to_rgb(h, l, new_s)
+
+    # Convert back to integer RGB values
+    new_r = int(new_r * 255)
+    new_g = int(new_g * 255)
+    new_b = int(new_b * 255)
+
+    # Return the desaturated RGB color
+    return new_r, new_g, new_b
+
+_tables = {}  # Map (hue, desaturation) to a (256, 3) uint8 lookup table
+_tuples = {}  # Map (hue, desaturation) to the same table as a list of RGB tuples, for scalar lookups
+
+def lookup_table(hue, desaturation=0):
+    '''
+    Returns the lookup table giving the color of every gray value for a hue, building it the first time.
+
+    Parameters:
+    - hue: Hue value in degrees (0 to 360)
+    - desaturation: Amount the colors are desaturated by, as in desaturate_color (default is 0)
+
+    Returns:
+    - NumPy uint8 array of shape (256, 3), indexed by gray value
+    '''
+
+    key = (hue, desaturation)
+    if key not in _tables:
+        table = [change_hue(gray_color=gray, new_hue=hue) for gray in range(256)]
+        if desaturation:
+            table = [desaturate_color(rgb, desaturation) for rgb in table]
+
+        _tables[key] = np.array(table, dtype=np.uint8)
+        _tuples[key] = table
+
+    return _tables[key]
+
+def color(gray_color, hue, desaturation=0):
+    '''
+    Looks up the color of one gray value, matching change_hue (and desaturate_color) without colorsys.
+
+    Parameters:
+    - gray_color: Number representing the gray color value (0 to 255), rounded down
+    - hue: Hue value in degrees (0 to 360)
+    - desaturation: Amount the color is desaturated by (default is 0)
+
+    Returns:
+    - Tuple containing the RGB color
+    '''
+
+    key = (hue, desaturation)
+    if key not in _tuples:
+        lookup_table(hue, desaturation)
+
+    return _tuples[key][max(0, min(int(gray_color), 255))]
+
+def colors(gray_colors, hue, desaturation=0):
+    '''
+    Looks up the colors of a whole array of gray values with one fancy-indexing operation.
+
+    Parameters:
+    - gray_colors: NumPy array of gray color values (0 to 255), rounded down
+    - hue: Hue value in degrees (0 to 360)
+    - desaturation: Amount the colors are desaturated by (default is 0)
+
+    Returns:
+    - NumPy uint8 array with the shape of gray_colors plus a trailing axis of 3 RGB values
+    '''
+
+    indices = np.clip(np.asarray(gray_colors), 0, 255).astype(np.intp)
+    return lookup_table(hue, desaturation)[indices]
+
+# Build the tables for every color the game draws up front
+for game_hue in GAME_HUES:
+    lookup_table(game_hue)
+    for amount in GAME_DESATURATIONS:
+        lookup_table(game_hue, amount)
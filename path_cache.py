@@ -0,0 +1,169 @@
+from collections import OrderedDict
+
+class PathCache:
+    '''
+    Class representing a bounded LRU cache that sits in front of a path_find function.
+
+    Paths are keyed by (start, end) and belong to a single grid version; when the version changes
+    (towers placed or destroyed) every cached path is dropped. A request whose start lies on a cached
+    path to the same end reuses that path's suffix instead of searching again.
+    '''
+
+    def __init__(self, path_find, max_entries=256):
+        '''
+        Constructor to initialize a PathCache object.
+
+        Parameters:
+        - path_find: Function with the signature path_find(grid, start, end) to cache results for
+        - max_entries: Maximum number of paths kept before the least recently used is evicted (default is 256)
+        '''
+
+        self.path_find = path_find
+        self.max_entries = max_entries
+        self.version = None
+
+        self.paths = OrderedDict()  # Map (start, end) to a cached path, least recently used first
+        self.suffixes = {}  # Map (node, end) to the (start, end) key of a cached path passing through node
+
+        self.hits = 0
+        self.suffix_hits = 0
+        self.misses = 0
+
+    def find(self, grid, start, end, version=0):
+        '''
+        Method to return a path from start to end, searching only if no cached path covers it.
+
+        Parameters:
+        - grid: The 2D numpy array representing the grid
+        - start: A tuple (row, col) representing the start node
+        - end: A tuple (row, col) representing the end node
+        - version: Integer grid version; cached paths from other versions are discarded (default is 0)
+
+        Returns:
+        - A list of tuples representing the path from start to end, or None if no path exists
+        '''
+
+        path = self.lookup(start, end, version)
+        if path is not None:
+            return path
+
+        path = self.path_find(grid, start, end)
+        self.store((start, end), path, version)
+
+        return None if path is None else list(path)
+
+    def lookup(self, start, end, version=0):
+        '''
+        Method to return a cached path from start to end without ever searching.
+
+        Parameters:
+        - start: A tuple (row, col) representing the start node
+        - end: A tuple (row, col) representing the end node
+        - version: Integer grid version; cached paths from other versions are discarded (default is 0)
+
+        Returns:
+        - A list of tuples representing the path from start to end, or None if no cached path covers it
+        '''
+
+        if version != self.version:
+            self.clear()
+            self.version = version
+
+        key = (start, end)
+
+        # Exact hit
+        if self.paths.get(key) is not None:
+            self.paths.move_to_end(key)
+            self.hits += 1
+            return list(self.paths[key])
+
+        # Start lies on a cached path heading for the same end, so its suffix is also optimal
+        if key in self.suffixes:
+            owner = self.suffixes[key]
+            self.paths.move_to_end(owner)
+            self.suffix_hits += 1
+            path = self.paths[owner]
+            return path[path.index(start):]
+
+        return None
+
+    def store(self, key, path, version=None):
+        '''
+        Method to record a search the cache missed and add its path, evicting the least recently used path if full.
+
+        Parameters:
+        - key: Tuple (start, end) the path was searched for
+        - path: List of tuples representing the path, or None if no path exists
+        - version: Optional grid version the search was made under; a path from another version than the
+          cached paths is counted but not kept (default is None, the cache's version)
+
+        Returns:
+        - None
+        '''
+
+        self.misses += 1
+        if version is not None and version != self.version:
+            return
+
+        self.paths[key] = path
+
+        if path is not None:
+            end = key[1]
+            for node in path[:-1]:
+                self.suffixes[(node, end)] = key
+
+        while len(self.paths) > self.max_entries:
+            self.evict()
+
+    def evict(self):
+        '''
+        Method to remove the least recently used path and any suffix entries pointing at it.
+
+        Returns:
+        - None
+        '''
+
+        key, path = self.paths.popitem(last=False)
+
+        if path is not None:
+            end = key[1]
+            for node in path[:-1]:
+                if self.suffixes.get((node, end)) == key:
+                    del self.suffixes[(node, end)]
+
+    def clear(self):
+        '''
+        Method to discard every cached path (hit/miss counters are kept).
+
+        Returns:
+        - None
+        '''
+
+        self.paths.clear()
+        self.suffixes.clear()
+
+    def stats(self):
+        '''
+        Method to report how much searching the cache has saved.
+
+        Returns:
+        - Dictionary with hits, suffix_hits, misses and hit_rate
+        '''
+
+        lookups = self.hits + self.suffix_hits + self.misses
+        hit_rate = (self.hits + self.suffix_hits) / lookups if lookups else 0
+
+        return {"hits": self.hits, "suffix_hits": self.suffix_hits,
+                "misses": self.misses, "hit_rate": hit_rate}
+
+    def __str__(self):
+        '''
+        Method to return a string representation of the cache statistics.
+
+        Returns:
+        - String summarising hits, suffix hits, misses and the hit rate
+        '''
+
+        stats = self.stats()
+        return (f"PathCache: {stats['hits']} hits, {stats['suffix_hits']} suffix hits, "
+                f"{stats['misses']} misses ({stats['hit_rate']:.0%} hit rate)")
@@ -0,0 +1,169 @@
+import heapq
+import itertools
+import time
+from concurrent.futures import Future
+
+import a_star_path
+
+class PathRequest:
+    '''
+    Class representing one queued path request and its resumable search.
+    '''
+
+    def __init__(self, grid, start, end, priority, version):
+        '''
+        Constructor to initialize a PathRequest object.
+
+        Parameters:
+        - grid: The 2D numpy array representing the grid
+        - start: A tuple (row, col) representing the start node
+        - end: A tuple (row, col) representing the end node
+        - priority: Number used to order requests, lower values are searched first
+        - version: Integer grid version the request was made under
+        '''
+
+        self.grid = grid
+        self.start, self.end = start, end
+        self.priority = priority
+        self.version = version
+        self.search = None  # Created when the request is first worked on
+        self.future = Future()
+
+class PathScheduler:
+    '''
+    Class representing a queue of path requests that is worked through under a per-frame time budget.
+
+    Searches are time-sliced: each one runs for a fixed number of node expansions at a time and is
+    resumed on the next frame if the budget runs out, so a wave spawning never stalls a single frame.
+    Results are delivered through futures that the requester polls.
+    '''
+
+    def __init__(self, budget_ms=2, expansions_per_slice=128, cache=None, landmarks=None):
+        '''
+        Constructor to initialize a PathScheduler object.
+
+        Parameters:
+        - budget_ms: Time in milliseconds that run may spend searching each frame (default is 2)
+        - expansions_per_slice: Number of node expansions between checks of the clock (default is 128)
+        - cache: Optional PathCache to answer requests from and store finished paths in (default is None)
+        - landmarks: Optional Landmarks to search with the ALT heuristic (default is None)
+        '''
+
+        self.budget_ms = budget_ms
+        self.expansions_per_slice = expansions_per_slice
+        self.cache = cache
+        self.landmarks = landmarks
+
+        self.queue = []  # Heap of (priority, order, request)
+        self.pending = {}  # Map (start, end) to the queued request, so duplicate requests share one search
+        self.order = itertools.count()  # Tie-breaker that keeps equal priorities first come, first served
+
+    def submit(self, grid, start, end, priority=0, version=0):
+        '''
+        Method to request a path, answering straight from the cache when possible.
+
+        Parameters:
+        - grid: The 2D numpy array representing the grid
+        - start: A tuple (row, col) representing the start node
+        - end: A tuple (row, col) representing the end node
+        - priority: Number used to order requests, lower values are searched first (default is 0)
+        - version: Integer grid version the request is made under (default is 0)
+
+        Returns:
+        - Future that resolves to a list of tuples representing the path, or None if no path exists
+        '''
+
+        if self.cache is not None:
+            path = self.cache.lookup(start, end, version)
+            if path is not None:
+                future = Future()
+                future.set_result(path)
+                return future
+
+        key = (start, end)
+        request = self.pending.get(key)
+
+        if request is not None and request.version == version and not request.future.cancelled():
+            # Share the queued search, moving it forward if the new requester is more urgent
+            if priority < request.priority:
+                request.priority = priority
+                heapq.heappush(self.queue, (priority, next(self.order), request))
+            return request.future
+
+        request = PathRequest(grid, start, end, priority, version)
+        self.pending[key] = request
+        heapq.heappush(self.queue, (priority, next(self.order), request))
+
+        return request.future
+
+    def run(self, budget_ms=None, max_expansions=None):
+        '''
+        Method to work on queued requests, most urgent first, until the time budget is spent.
+
+        Giving max_expansions bounds the work by node expansions instead of time, so the same requests
+        finish on the same calls however fast the machine is, e.g. in headless games.
+
+        Parameters:
+        - budget_ms: Time in milliseconds to spend this call (default is None, which uses the scheduler's budget)
+        - max_expansions: Optional number of node expansions to do this call instead of a time budget (default is None)
+
+        Returns:
+        - Number of requests completed during this call
+        '''
+
+        deadline = time.perf_counter() + (self.budget_ms if budget_ms is None else budget_ms) / 1000
+        expanded = 0
+        completed = 0
+
+        while self.queue:
+            if max_expansions is None:
+                if time.perf_counter() >= deadline:
+                    break
+            elif expanded >= max_expansions:
+                break
+
+            priority, _, request = self.queue[0]
+
+            # Drop cancelled requests and entries left behind when a request was re-prioritised
+            if request.future.done() or priority != request.priority:
+                heapq.heappop(self.queue)
+                if request.future.done() and self.pending.get((request.start, request.end)) is request:
+                    del self.pending[(request.start, request.end)]
+                continue
+
+            if request.search is None:
+                request.search = a_star_path.Search(request.grid, request.start, request.end,
+                                                    landmarks=self.landmarks)
+
+            # Never expand past the expansion bound, if there is one
+            expansions = self.expansions_per_slice
+            if max_expansions is not None:
+                expansions = min(expansions, max_expansions - expanded)
+
+            before = request.search.expansions
+            finished = request.search.step(expansions)
+            expanded += request.search.expansions - before
+
+            if finished:
+                heapq.heappop(self.queue)
+                if self.pending.get((request.start, request.end)) is request:
+                    del self.pending[(request.start, request.end)]
+
+                path = request.search.path
+                if self.cache is not None:
+                    self.cache.store((request.start, request.end), path, request.version)
+
+                request.future.set_result(None if path is None else list(path))
+                completed += 1
+
+        return completed
+
+    def __len__(self):
+        '''
+        Method to return the number of requests still waiting for a path.
+
+        Returns:
+        - Integer count of pending requests
+        '''
+
+        return len(self.pending)
@@ -0,0 +1,174 @@
+import numpy as np
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import a_star_path
+import terrain_graph
+
+# Per-process state, set up once in each worker by init_worker
+worker_grid = None
+worker_occupancy = None
+worker_graph = None
+worker_memory = []
+
+def attach_array(name, shape, dtype):
+    '''
+    Attaches to a shared memory block and views it as a NumPy array without copying.
+
+    Parameters:
+    - name: Name of the shared memory block
+    - shape: Tuple with the shape of the array
+    - dtype: NumPy dtype of the array
+
+    Returns:
+    - NumPy array backed by the shared memory block
+    '''
+
+    memory = shared_memory.SharedMemory(name=name)
+    worker_memory.append(memory)  # Keep the block mapped for the life of the worker
+    return np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+
+def init_worker(grid_name, occupancy_name, shape):
+    '''
+    Initializes a worker process with views of the shared terrain and tower occupancy arrays.
+
+    Parameters:
+    - grid_name: Name of the shared memory block holding the terrain heights
+    - occupancy_name: Name of the shared memory block holding the tower occupancy
+    - shape: Tuple with the shape of the terrain grid
+
+    Returns:
+    - None
+    '''
+
+    global worker_grid, worker_occupancy, worker_graph
+
+    worker_grid = attach_array(grid_name, shape, np.float64)
+    worker_occupancy = attach_array(occupancy_name, shape, np.bool_)
+
+    # Built once per worker, every request after that only sends its start and end
+    worker_graph = terrain_graph.TerrainGraph(worker_grid)
+
+def worker_path_find(start, end):
+    '''
+    Finds a path inside a worker process using the shared terrain.
+
+    Parameters:
+    - start: A tuple (row, col) representing the start node
+    - end: A tuple (row, col) representing the end node
+
+    Returns:
+    - A list of tuples representing the path from start to end, or None if no path exists
+      or the end is no longer occupied by a tower
+    '''
+
+    if not worker_occupancy[end]:
+        return None  # The tower died while the request was queued
+
+    return a_star_path.path_find(worker_grid, start, end, graph=worker_graph)
+
+class PathWorkerPool:
+    '''
+    Class representing an optional process pool that runs path searches off the render thread.
+
+    The terrain heights and a tower occupancy array live in multiprocessing shared memory, so requests
+    only send a start and an end. It offers the same submit method as PathScheduler, returning a future
+    that enemies poll from determine_movement; a_star_path stays the reference in-process implementation.
+    '''
+
+    def __init__(self, grid, workers=None):
+        '''
+        Constructor to initialize a PathWorkerPool object.
+
+        Parameters:
+        - grid: 2D NumPy array representing the terrain heights
+        - workers: Number of worker processes (default is None, one per spare core)
+        '''
+
+        self.shape = grid.shape
+        self.version = None
+
+        # Copy the terrain into shared memory once; the occupancy is rewritten in place when towers change
+        self.grid_memory = shared_memory.SharedMemory(create=True, size=max(1, grid.size * 8))
+        self.grid = np.ndarray(self.shape, dtype=np.float64, buffer=self.grid_memory.buf)
+        self.grid[:] = grid
+
+        self.occupancy_memory = shared_memory.SharedMemory(create=True, size=max(1, grid.size))
+        self.occupancy = np.ndarray(self.shape, dtype=np.bool_, buffer=self.occupancy_memory.buf)
+        self.occupancy[:] = False
+
+        if workers is None:
+            workers = max(1, (os.cpu_count() or 2) - 1)
+        self.workers = workers
+
+        self.start_workers()
+
+    def start_workers(self):
+        '''
+        Method to start the worker processes, attached to the shared terrain and occupancy.
+
+        Returns:
+        - None
+        '''
+
+        self.executor = ProcessPoolExecutor(max_workers=self.workers,
+                                            initializer=init_worker,
+                                            initargs=(self.grid_memory.name, self.occupancy_memory.name, self.shape))
+
+    def submit(self, grid, start, end, priority=0, version=0):
+        '''
+        Method to queue a path search on the worker processes.
+
+        Parameters:
+        - grid: The 2D numpy array representing the grid (unused, the workers read the shared copy)
+        - start: A tuple (row, col) representing the start node
+        - end: A tuple (row, col) representing the end node
+        - priority: Accepted for compatibility with PathScheduler; the pool serves requests in order
+        - version: Accepted for compatibility with PathScheduler
+
+        Returns:
+        - Future that resolves to a list of tuples representing the path, or None if no path exists
+        '''
+
+        start, end = (int(start[0]), int(start[1])), (int(end[0]), int(end[1]))
+        try:
+            return self.executor.submit(worker_path_find, start, end)
+        except BrokenProcessPool:
+            # A worker died and took the pool with it; its pending searches have failed, so start a fresh pool
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.start_workers()
+            return self.executor.submit(worker_path_find, start, end)
+
+    def update(self, tower_grid, version):
+        '''
+        Method to refresh the shared tower occupancy if the tower layout has changed.
+
+        Parameters:
+        - tower_grid: 2D NumPy array representing the tower grid
+        - version: Integer counter that changes whenever towers are placed or removed
+
+        Returns:
+        - None
+        '''
+
+        if version != self.version:
+            self.occupancy[:] = np.not_equal(tower_grid, None)
+            self.version = version
+
+    def close(self):
+        '''
+        Method to stop the worker processes and release the shared memory.
+
+        Returns:
+        - None
+        '''
+
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+        # Drop the array views before closing the blocks they point into
+        del self.grid, self.occupancy
+        for memory in (self.grid_memory, self.occupancy_memory):
+            memory.close()
+            memory.unlink()
@@ -6,6 +6,24 @@ infoObject = pygame.display.Info()
 auto_resolution = True
 resolution = (900, 700)
 selected_difficulty = "easy"
+# "flow_field" shares one field between enemies, "path_find" searches per enemy,
+# "hierarchical" searches per enemy with near-optimal HPA* over clusters of cells, for the largest maps,
+# "resumable" keeps a backward search per tower and continues it for each new enemy rather than searching afresh,
+# "scheduled" queues searches and spreads them over frames within a time budget,
+# "workers" runs searches on a process pool that shares the terrain through shared memory
+navigation_mode = "flow_field"
+landmark_heuristic = True  # Use precomputed landmarks (ALT) as the A* heuristic when searching per enemy
+terrain_generator = "diamond_square"  # "diamond_square" for rolling hills, "caves" for cellular-automaton caves
+terrain_cache = True  # Keep generated terrain on disk and reload it instead of regenerating
+terrain_cache_dir = "terrain_cache"  # Relative to the game directory
+terrain_cache_mb = 64  # Least recently used maps are deleted once the cache grows past this size
+streaming_terrain = False  # Generate the map lazily in chunks, for worlds too large to hold in memory; needs navigation_mode "path_find"
+world_chunks = (8, 8)  # Size of the streamed map in chunks
+chunk_power = 6  # Each chunk is 2^chunk_power cells square
+sniper_policy = "closest"  # Which enemy a sniper targets: "closest", "weakest" or "strongest"
+sniper_range = None  # Distance in cells, counting height difference, snipers can shoot; None for unlimited
+tick_rate = 60  # Game logic ticks per second, independent of how fast frames are drawn
+frame_rate_cap = 60  # Most frames drawn per second; 0 for uncapped, with enemies interpolated between ticks
 
 if auto_resolution:
     resolution = (infoObject.current_w, infoObject.current_h)
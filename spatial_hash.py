@@ -0,0 +1,225 @@
+import math
+
+import pygame
+
+class SpatialHash:
+    '''
+    Class representing a uniform-grid spatial index of items standing on grid cells.
+
+    Cells are grouped into square buckets, so finding the items near a cell only looks at the buckets
+    around it instead of every item. Items are moved between buckets as they change cell, which keeps
+    the index current at the cost of a dictionary update per move.
+    '''
+
+    def __init__(self, bucket_size=8):
+        '''
+        Constructor to initialize a SpatialHash object.
+
+        Parameters:
+        - bucket_size: Side length in cells of each bucket (default is 8)
+        '''
+
+        self.bucket_size = bucket_size
+        self.cells = {}  # Map each item to the (row, col) it stands on
+        self.buckets = {}  # Map (bucket row, bucket col) to a dict of its items, used as an ordered set
+        self.occupants = {}  # Map (row, col) to a dict of the items on it, used as an ordered set
+
+    def bucket_of(self, cell):
+        '''
+        Method to get the bucket a cell belongs to.
+
+        Parameters:
+        - cell: Tuple (row, col)
+
+        Returns:
+        - Tuple (bucket row, bucket col)
+        '''
+
+        return cell[0] // self.bucket_size, cell[1] // self.bucket_size
+
+    def insert(self, item, cell):
+        '''
+        Method to add an item standing on a cell.
+
+        Parameters:
+        - item: Hashable item, e.g. a sprite
+        - cell: Tuple (row, col) the item stands on
+
+        Returns:
+        - None
+        '''
+
+        cell = (int(cell[0]), int(cell[1]))
+        self.cells[item] = cell
+        self.buckets.setdefault(self.bucket_of(cell), {})[item] = None
+        self.occupants.setdefault(cell, {})[item] = None
+
+    def remove(self, item):
+        '''
+        Method to remove an item, if it is in the index.
+
+        Parameters:
+        - item: Item to remove
+
+        Returns:
+        - None
+        '''
+
+        cell = self.cells.pop(item, None)
+        if cell is None:
+            return
+
+        # Drop emptied entries so the dictionaries only hold occupied buckets and cells
+        bucket = self.bucket_of(cell)
+        del self.buckets[bucket][item]
+        if not self.buckets[bucket]:
+            del self.buckets[bucket]
+
+        del self.occupants[cell][item]
+        if not self.occupants[cell]:
+            del self.occupants[cell]
+
+    def move(self, item, cell):
+        '''
+        Method to move an item to another cell.
+
+        Parameters:
+        - item: Item already in the index
+        - cell: Tuple (row, col) the item now stands on
+
+        Returns:
+        - None
+        '''
+
+        if self.cells.get(item) != cell:
+            self.remove(item)
+            self.insert(item, cell)
+
+    def at(self, cell):
+        '''
+        Method to get the items standing on one cell.
+
+        Parameters:
+        - cell: Tuple (row, col)
+
+        Returns:
+        - List of items on the cell
+        '''
+
+        return list(self.occupants.get(cell, ()))
+
+    def within(self, cell, radius):
+        '''
+        Method to get the items within a straight-line distance of a cell.
+
+        Parameters:
+        - cell: Tuple (row, col) to measure from
+        - radius: Distance in cells
+
+        Returns:
+        - List of items whose cell is at most radius from the cell
+        '''
+
+        reach = math.ceil(radius / self.bucket_size)
+        bucket_row, bucket_col = self.bucket_of(cell)
+        found = []
+
+        for row in range(bucket_row - reach, bucket_row + reach + 1):
+            for col in range(bucket_col - reach, bucket_col + reach + 1):
+                for item in self.buckets.get((row, col), ()):
+                    item_row, item_col = self.cells[item]
+                    if (item_row - cell[0])**2 + (item_col - cell[1])**2 <= radius**2:
+                        found.append(item)
+
+        return found
+
+    def ring(self, centre, radius):
+        '''
+        Method to yield the occupied buckets on the square ring a number of buckets out from a bucket.
+
+        Parameters:
+        - centre: Tuple (bucket row, bucket col) at the middle of the ring
+        - radius: Integer Chebyshev distance of the ring from the centre, 0 for the centre itself
+
+        Returns:
+        - Generator of dicts of the items in each occupied bucket on the ring
+        '''
+
+        row, col = centre
+        if radius == 0:
+            keys = [centre]
+        else:
+            keys = [(row - radius, col + i) for i in range(-radius, radius + 1)]
+            keys += [(row + radius, col + i) for i in range(-radius, radius + 1)]
+            keys += [(row + i, col - radius) for i in range(-radius + 1, radius)]
+            keys += [(row + i, col + radius) for i in range(-radius + 1, radius)]
+
+        for key in keys:
+            bucket = self.buckets.get(key)
+            if bucket:
+                yield bucket
+
+    def nearest(self, cell, distance=None, max_distance=math.inf):
+        '''
+        Method to find the item closest to a cell, searching rings of buckets outwards from it.
+
+        Parameters:
+        - cell: Tuple (row, col) to measure from
+        - distance: Optional function of an item giving its distance from the cell, e.g. one that also
+          counts the height difference; it must never be less than the straight-line distance between
+          the cells, which the search uses to stop early (default is None, the straight-line distance)
+        - max_distance: Items further away than this are ignored (default is infinity)
+
+        Returns:
+        - Closest item, or None if there is none within max_distance
+        '''
+
+        if not self.buckets:
+            return None
+
+        centre = self.bucket_of(cell)
+        last_ring = max(max(abs(row - centre[0]), abs(col - centre[1])) for row, col in self.buckets)
+
+        closest, shortest_distance = None, max_distance
+        for radius in range(last_ring + 1):
+            # Every cell of a bucket on this ring is at least this far along one axis
+            if (radius - 1) * self.bucket_size + 1 > shortest_distance:
+                break
+
+            for bucket in self.ring(centre, radius):
+                for item in bucket:
+                    if distance is None:
+                        item_row, item_col = self.cells[item]
+                        item_distance = math.hypot(item_row - cell[0], item_col - cell[1])
+                    else:
+                        item_distance = distance(item)
+
+                    if item_distance < shortest_distance:
+                        closest, shortest_distance = item, item_distance
+
+        return closest
+
+class SpatialGroup(pygame.sprite.Group):
+    '''
+    Class representing a sprite group of stationary sprites, e.g. towers, indexed by their grid_pos.
+    '''
+
+    def __init__(self, *sprites, bucket_size=8):
+        '''
+        Constructor to initialize a SpatialGroup object.
+
+        Parameters:
+        - *sprites: Sprites to add straight away
+        - bucket_size: Side length in cells of each bucket of the index (default is 8)
+        '''
+
+        self.spatial = SpatialHash(bucket_size)
+        super().__init__(*sprites)
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+        self.spatial.insert(sprite, sprite.grid_pos)
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        self.spatial.remove(sprite)
@@ -4,16 +4,17 @@ from collections import deque
 import random
 
 import tools
-
-#import path_finding
-# import djikstras as path_finding
-import a_star_path as path_finding
+import palette
+import settings
+import enemy_store
 
 class Tower(pygame.sprite.Sprite):
     '''
     Class representing a tower in a tower defense game.
     '''
 
+    grid_version = 0  # Incremented whenever a tower is placed on or removed from the tower grid
+
     def __init__(self, pos, cells, tower_grid, dimensions=(1, 1)):
         '''
         Constructor to initialize a Tower object.
@@ -41,29 +42,54 @@ class Tower(pygame.sprite.Sprite):
                 y = self.grid_row + i
                 x = self.grid_col + j
                 tower_grid[y, x] = self
+        Tower.grid_version += 1
 
         # Set the height attribute based on the cell at the tower's position
         self.height = cells[pos]
 
-    def update(self, screen, scale, offset, font, enemies, Game_Data, paused):
+    def simulate(self, enemies, Game_Data):
         '''
-        Update method for the Tower object.
+        Method to run one tick of the tower's game logic; towers that only block paths do nothing.
+
+        Parameters:
+        - enemies: Pygame sprite group containing enemies
+        - Game_Data: Instance of the game data class
+
+        Returns:
+        - None
+        '''
+
+    def render(self, screen, scale, offset, font, Game_Data, camera=None):
+        '''
+        Method to draw the tower if it is on screen.
 
         Parameters:
         - screen: Pygame display surface
         - scale: Scaling factor for grid cell size
         - offset: Tuple containing the (x, y) offset of the grid
         - font: Pygame font object for displaying information
-        - enemies: Pygame sprite group containing enemies
         - Game_Data: Instance of the game data class
-        - paused: Boolean indicating whether the game is paused
+        - camera: Optional viewport.Camera used to skip drawing towers off screen (default is None)
 
         Returns:
         - None
-        (Modifies the screen and other parameters during the update)
         '''
 
-        self.draw(screen, scale, offset, font, Game_Data)
+        if self.on_screen(camera):
+            self.draw(screen, scale, offset, font, Game_Data)
+
+    def on_screen(self, camera):
+        '''
+        Method to check whether any part of the tower is on screen.
+
+        Parameters:
+        - camera: viewport.Camera for this frame, or None to always draw
+
+        Returns:
+        - True if the tower should be drawn, False otherwise
+        '''
+
+        return camera is None or camera.can_see(self.grid_row, self.grid_col, *self.dimensions)
 
     def hurt(self, damage, enemies, tower_grid):
         '''
@@ -83,37 +109,6 @@ class Tower(pygame.sprite.Sprite):
         if self.health <= 0:
             self.die(enemies, tower_grid)
 
-    def get_closest_enemy(self, enemies, consider_height=False):
-        '''
-        Method to find the closest enemy to the tower.
-
-        Parameters:
-        - enemies: Pygame sprite group containing enemies
-        - consider_height: Boolean indicating whether to consider the height difference
-
-        Returns:
-        - Closest enemy to the tower or None if there are no enemies
-        '''
-
-        if len(enemies.sprites()) == 0:
-            return None
-
-        closest_enemy = None
-        shortest_distance = 9999
-
-        for enemy in enemies:
-            if enemy.name != "Wall" and enemy.grid_pos is not None:
-                delta_height = enemy.height - self.height if consider_height else 0
-                delta_x = enemy.grid_row - self.grid_row
-                delta_y = enemy.grid_col - self.grid_col
-                distance = (delta_height**2 + delta_x**2 + delta_y**2)**(1/2)
-
-                if distance < shortest_distance:
-                    shortest_distance = distance
-                    closest_enemy = enemy
-
-        return closest_enemy
-
     def die(self, enemies, tower_grid):
         '''
         Method to handle the tower's death.
@@ -133,6 +128,7 @@ class Tower(pygame.sprite.Sprite):
                 y = self.grid_row + i
                 x = self.grid_col + j
                 tower_grid[y, x] = None
+        Tower.grid_version += 1
 
         # Clear goal queues of enemies targeting the tower
         for enemy in enemies:
@@ -140,6 +136,11 @@ class Tower(pygame.sprite.Sprite):
                 if enemy.goal_queue[-1] == self.grid_pos:
                     enemy.goal_queue.clear()
 
+            # Abandon paths still being searched for towards the tower
+            if enemy.path_future is not None and enemy.path_goal == self.grid_pos:
+                enemy.path_future.cancel()
+                enemy.path_future = None
+
         # Remove the tower sprite
         self.kill()
                     
@@ -150,26 +151,22 @@ class Bait(Tower):
         self.max_health = self.health = 10
 
     def draw(self, screen, scale, offset, font, animation_adjustment):
-        color = tools.change_hue(gray_color=self.height, 
-                                 new_hue=240)
+        x, y = tools.grid_to_screen(self.grid_row, self.grid_col, scale, offset)
+        color = palette.color(self.height, hue=240)
         
         # Border
         pygame.draw.rect(screen, (255, 255, 255),
-            (offset[0]*scale + self.grid_col*5*scale - 0.5*scale, # x
-             offset[1]*scale + self.grid_row*5*scale - 0.5*scale, # y
+            (x - 0.5*scale, # x
+             y - 0.5*scale, # y
              6*scale, 6*scale),               # size
              border_radius=2)  
 
         # Flesh
         pygame.draw.rect(screen, color,
-            (offset[0]*scale + self.grid_col*5*scale, # x
-             offset[1]*scale + self.grid_row*5*scale, # y
-             5*scale, 5*scale),               # size
+            (x, y, 5*scale, 5*scale),               # size
              border_radius=2)                 # border
-        
-    def update(self, screen, scale, offset, font, Game_Data, paused):
-        self.draw(screen, scale, offset, font, Game_Data)
-        
+
+
 class Sniper(Tower):
     def __init__(self, pos, cells, tower_grid):
         super().__init__(pos, cells, tower_grid)
@@ -180,10 +177,9 @@ class Sniper(Tower):
         self.target = None
 
     def draw(self, screen, scale, offset, font, Game_Data):
-        posx, posy = offset[0]*scale + self.grid_col*5*scale, offset[1]*scale + self.grid_row*5*scale
+        posx, posy = tools.grid_to_screen(self.grid_row, self.grid_col, scale, offset)
 
-        color = tools.change_hue(gray_color=self.height, 
-                                 new_hue=45)
+        color = palette.color(self.height, hue=45)
         
         # Border
         pygame.draw.rect(screen, (255, 128, 128),
@@ -202,14 +198,13 @@ class Sniper(Tower):
         hitbox_half_length = 2.5*scale
         turret_pivot_x, turret_pivot_y = posx + hitbox_half_length, posy + hitbox_half_length
 
-        turret =  pygame.Surface((8*scale, 2*scale), pygame.SRCALPHA)
-        turret.fill((128, 128, 128))
-
-        nozzle =  pygame.Surface((1.2*scale, 3*scale), pygame.SRCALPHA)
-        nozzle.fill((64, 64, 64))
+        # Shared surfaces, so their rotations come from the cache instead of being redone every frame
+        turret = tools.rotation_cache.get_shape((8*scale, 2*scale), (128, 128, 128))
+        nozzle = tools.rotation_cache.get_shape((1.2*scale, 3*scale), (64, 64, 64))
         
         if self.target != None:
-            target_centre = self.target.pos + pygame.Vector2(2.5 * scale, 2.5 * scale)
+            target_centre = (pygame.Vector2(tools.grid_to_screen(self.target.row, self.target.col, scale, offset))
+                             + pygame.Vector2(2.5 * scale, 2.5 * scale))
 
             angle = tools.get_angle_to_point(pygame.Vector2(posx, posy),
                                              target_centre)
@@ -241,18 +236,20 @@ class Sniper(Tower):
                 self.shoot_cooldown = int(self.shoot_cooldown*0.9)
             self.shoot_ticks = self.shoot_cooldown
         
-    def update(self, screen, scale, offset, font, enemies, Game_Data, paused): 
-        if not paused:
-            if self.target == None:
-                self.target = self.get_closest_enemy(enemies, consider_height=True)
-
-            elif self.target != None:
-                if self.shoot_ticks == self.shoot_cooldown:
-                    self.shoot_ticks = 0
-                    self.shoot()
-                else:
-                    self.shoot_ticks += 1
-        self.draw(screen, scale, offset, font, Game_Data)   
+    def simulate(self, enemies, Game_Data):
+        # Targets are chosen for every sniper at once by targeting.assign_targets before towers are simulated
+        if self.target != None:
+            if self.shoot_ticks == self.shoot_cooldown:
+                self.shoot_ticks = 0
+                self.shoot()
+            else:
+                self.shoot_ticks += 1
+
+    def render(self, screen, scale, offset, font, Game_Data, camera=None):
+        if self.on_screen(camera):
+            self.draw(screen, scale, offset, font, Game_Data)
+        else:
+            self.shooting = False  # The shot's beam is only shown on the frame it is fired
         
 
     def shoot(self):
@@ -266,49 +263,35 @@ class Producer(Tower):
         self.max_health = self.health = 10
 
     def draw(self, screen, scale, offset, font, Game_Data):
-        color = tools.change_hue(gray_color=self.height, 
-                                 new_hue=200)
+        x, y = tools.grid_to_screen(self.grid_row, self.grid_col, scale, offset)
+        color = palette.color(self.height, hue=200)
         
         # Border
         pygame.draw.rect(screen, (255, 255, 255),
-            (offset[0]*scale + self.grid_col*5*scale - 0.5*scale, # x
-             offset[1]*scale + self.grid_row*5*scale - 0.5*scale, # y
+            (x - 0.5*scale, # x
+             y - 0.5*scale, # y
              6*scale, 6*scale),               # size
              border_radius=1)  
 
-        flesh_rect = pygame.rect.Rect(offset[0]*scale + self.grid_col*5*scale, # x
-                                      offset[1]*scale + self.grid_row*5*scale, # y
-                                      5*scale, 5*scale)
+        flesh_rect = pygame.rect.Rect(x, y, 5*scale, 5*scale)
         
         # Flesh
         pygame.draw.rect(screen, color,
                          flesh_rect,               # size
                          border_radius=0)          # border
         
-        center = flesh_rect.center
-        cog = pygame.rect.Rect(0, 0, 4*scale, 4*scale)
-
-        # Create surfaces from cog rectangles
-        cw_cog_surface = pygame.Surface((3*scale, 3*scale), pygame.SRCALPHA)
-        pygame.draw.rect(cw_cog_surface, (255, Game_Data.count % 255, 255), cog)
-
-        acw_cog_surface = pygame.Surface((3*scale, 3*scale), pygame.SRCALPHA)
-        pygame.draw.rect(acw_cog_surface, (255, Game_Data.count % 255, 255), cog)
-
-        # Rotate the cogs
-        rotated_cw_cog = pygame.transform.rotate(cw_cog_surface, Game_Data.count % 180)
-        rotated_acw_cog = pygame.transform.rotate(acw_cog_surface, -Game_Data.count % 180)
-
-        # Get the new rects after rotation
-        rotated_cw_cog_rect = rotated_cw_cog.get_rect(center=center)
-        rotated_acw_cog_rect = rotated_acw_cog.get_rect(center=center)
-
-        # Draw the rotated cogs onto the screen
-        screen.blit(rotated_cw_cog, rotated_cw_cog_rect.topleft)
-        screen.blit(rotated_acw_cog, rotated_acw_cog_rect.topleft)
+        # The cogs change color every frame, so a cached rotation would never be reused; they are drawn
+        # as rotated squares instead of building and rotating two surfaces per producer per frame
+        center = pygame.Vector2(flesh_rect.center)
+        cog_color = (255, Game_Data.count % 255, 255)
+        half_side = int(3*scale) / 2 - 0.5  # Polygon edges are filled inclusively
+        corners = [pygame.Vector2(half_side, half_side).rotate(90 * i) for i in range(4)]
+
+        # Rotate the cogs anticlockwise on screen, as pygame.transform.rotate does
+        for angle in (Game_Data.count % 180, -Game_Data.count % 180):
+            pygame.draw.polygon(screen, cog_color, [center + corner.rotate(-angle) for corner in corners])
     
-    def update(self, screen, scale, offset, font, enemies, Game_Data, paused):
-        self.draw(screen, scale, offset, font, Game_Data)
+    def simulate(self, enemies, Game_Data):
         if Game_Data.count % 255 == 0:
             Game_Data.cash += 120
             Game_Data.difficulty += 0.1
@@ -320,20 +303,19 @@ class Wall(Tower):
         self.max_health = self.health = 10
 
     def draw(self, screen, scale, offset, font, animation_adjustment):
+        x, y = tools.grid_to_screen(self.grid_row, self.grid_col, scale, offset)
         color = (self.height, self.height, self.height)
         
         # Border
         pygame.draw.rect(screen, (255, 255, 255),
-            (offset[0]*scale + self.grid_col*5*scale - 0.5*scale, # x
-             offset[1]*scale + self.grid_row*5*scale - 0.5*scale, # y
+            (x - 0.5*scale, # x
+             y - 0.5*scale, # y
              6*scale, 6*scale),               # size
              border_radius=0)  
 
         # Flesh
         pygame.draw.rect(screen, color,
-            (offset[0]*scale + self.grid_col*5*scale, # x
-             offset[1]*scale + self.grid_row*5*scale, # y
-             5*scale, 5*scale),               # size
+            (x, y, 5*scale, 5*scale),               # size
              border_radius=0)  
         
 class Headquarters(Tower):
@@ -343,28 +325,45 @@ class Headquarters(Tower):
         self.max_health = self.health = 30
 
     def draw(self, screen, scale, offset, font, animation_adjustment):
-        color = tools.change_hue(gray_color=self.height, 
-                                 new_hue=120)
+        x, y = tools.grid_to_screen(self.grid_row, self.grid_col, scale, offset)
+        color = palette.color(self.height, hue=120)
         
         # Border
         pygame.draw.rect(screen, (255, 255, 255),
-            (offset[0]*scale + self.grid_col*5*scale - 0.5*scale, # x
-             offset[1]*scale + self.grid_row*5*scale - 0.5*scale, # y
+            (x - 0.5*scale, # x
+             y - 0.5*scale, # y
              11*scale, 11*scale),               # size
              border_radius=5)  
 
         # Flesh
         pygame.draw.rect(screen, color,
-            (offset[0]*scale + self.grid_col*5*scale, # x
-             offset[1]*scale + self.grid_row*5*scale, # y
-             10*scale, 10*scale),               # size
+            (x, y, 10*scale, 10*scale),               # size
              border_radius=5)                       # border
         
 class Enemy(pygame.sprite.Sprite):
     '''
     Class representing an enemy in a tower defense game.
+
+    The values that change every tick are views onto the enemy's row in an enemy_store.EnemyStore,
+    which moves every enemy at once; the enemy itself only handles choosing paths and attacking.
     '''
 
+    # Values kept in the enemy's row of the store
+    row = enemy_store.Field("position", 0)
+    col = enemy_store.Field("position", 1)
+    grid_row = enemy_store.Field("cell", 0)
+    grid_col = enemy_store.Field("cell", 1)
+    target_grid_row = enemy_store.Field("target", 0)
+    target_grid_col = enemy_store.Field("target", 1)
+    step_row = enemy_store.Field("step", 0)
+    step_col = enemy_store.Field("step", 1)
+    ticks_left = enemy_store.Field("ticks_left")
+    speed = enemy_store.Field("speed")
+    health = enemy_store.Field("health")
+    damage_ticks = enemy_store.Field("damage_ticks")
+    damage_cooldown = enemy_store.Field("damage_cooldown")
+    height = enemy_store.Field("height")
+
     def __init__(self, Game_Data, name="Enemy", speed=1, max_health=1, damage=1):
         '''
         Constructor to initialize an Enemy object.
@@ -379,9 +378,11 @@ class Enemy(pygame.sprite.Sprite):
 
         super().__init__()
 
+        # Hold the enemy's values until it is added to a store
+        self.store = self.index = None
+        self.record = enemy_store.new_record()
+
         # Initialize attributes
-        self.grid_pos = None
-        self.height = None
         self.level = 1 + Game_Data.difficulty // 2.151436  # Made it a weird decimal for variety
         self.speed = speed
         self.health = self.max_health = max_health * self.level
@@ -389,18 +390,27 @@ class Enemy(pygame.sprite.Sprite):
         self.damage_cooldown = self.damage_ticks = 60
         self.name = name
 
-        # Initialize movement and goal queues
-        self.movement_queue = deque()
+        # Initialize the goal queue; movement towards the next goal is kept in the store
         self.goal_queue = deque()
 
-    def spawn(self, cells, offset, scale):
+        # Path requested from a scheduler but not yet found, and the goal it leads to
+        self.path_future = None
+        self.path_goal = None
+
+    @property
+    def grid_pos(self):
+        '''
+        Tuple containing the (row, col) of the cell the enemy occupies, or None before it has spawned.
+        '''
+
+        return None if self.grid_row < 0 else (self.grid_row, self.grid_col)
+
+    def spawn(self, cells):
         '''
         Method to spawn the enemy at a random position along the border of the grid.
 
         Parameters:
         - cells: 2D NumPy array representing the grid of cells
-        - offset: Tuple containing the (x, y) offset of the grid
-        - scale: Scaling factor for grid cell size
 
         Returns:
         - None
@@ -421,19 +431,13 @@ class Enemy(pygame.sprite.Sprite):
 
         # Choose a random position along the border
         random_index = np.random.choice(len(flattened_border_coords))
-        self.grid_pos = flattened_border_coords[random_index]
-        self.grid_row, self.grid_col = self.grid_pos
+        self.grid_row, self.grid_col = flattened_border_coords[random_index]
 
         # Set initial positions and attributes
         self.row, self.col = self.grid_row, self.grid_col
         self.target_grid_row, self.target_grid_col = self.grid_row, self.grid_col
         self.height = cells[self.grid_pos]
 
-        # Set hitbox and position for drawing on the screen
-        self.hitbox = pygame.rect.Rect((self.grid_col, self.grid_row), (5, 5))
-        self.pos = pygame.Vector2(offset[0] * scale + self.hitbox.x * 5 * scale,
-                                  offset[1] * scale + self.hitbox.y * 5 * scale)
-
     def get_closest_tower_pos(self, towers, consider_height=False):
         '''
         Method to find the closest tower's position to the enemy.
@@ -449,6 +453,17 @@ class Enemy(pygame.sprite.Sprite):
         if len(towers.sprites()) == 0:
             return None
 
+        def get_distance(tower):
+            delta_height = int(tower.height) - int(self.height) if consider_height else 0
+            delta_x = tower.grid_row - self.grid_row
+            delta_y = tower.grid_col - self.grid_col
+            return (delta_height**2 + delta_x**2 + delta_y**2)**(1/2)
+
+        # Search outwards from the enemy through the towers' spatial hash instead of measuring every tower
+        if hasattr(towers, "spatial"):
+            closest_tower = towers.spatial.nearest(self.grid_pos, get_distance, max_distance=9999)
+            return None if closest_tower is None else closest_tower.grid_pos
+
         closest_pos = None
         shortest_distance = 9999
 
@@ -456,10 +471,7 @@ class Enemy(pygame.sprite.Sprite):
             if tower.name == "Wallz":
                 pass
             else:
-                delta_height = tower.height - self.height if consider_height else 0
-                delta_x = tower.grid_row - self.grid_row
-                delta_y = tower.grid_col - self.grid_col
-                distance = (delta_height**2 + delta_x**2 + delta_y**2)**(1/2)
+                distance = get_distance(tower)
 
                 if distance < shortest_distance:
                     shortest_distance = distance
@@ -478,6 +490,10 @@ class Enemy(pygame.sprite.Sprite):
         - List of tower objects that the enemy is currently touching
         '''
 
+        # Towers indexed by cell are looked up directly
+        if hasattr(towers, "spatial"):
+            return towers.spatial.at(self.grid_pos)
+
         touching_towers = []
         for tower in towers:
             if tower.grid_pos == self.grid_pos:
@@ -534,50 +550,43 @@ class Enemy(pygame.sprite.Sprite):
             tower.target = None
         self.kill()
 
-    def damage_update(self, towers, enemies, tower_grid):
-        '''
-        Method to update the damage cooldown and inflict damage on nearby towers.
-
-        Parameters:
-        - towers: Pygame sprite group containing towers
-        - enemies: Pygame sprite group containing enemies
-        - tower_grid: 2D NumPy array representing the tower grid
-
-        Returns:
-        - None
-        (Modifies the damage cooldown and may inflict damage on towers)
-        '''
-
-        if self.damage_ticks >= self.damage_cooldown:
-            self.damage_ticks = 0
-            touching_towers = self.get_touching_towers(towers)
-            self.inflict_damage(touching_towers, enemies, tower_grid)
-        else:
-            self.damage_ticks += 1
-
-    def navigate_to(self, cells, goal):
+    def navigate_to(self, cells, goal, path_cache, scheduler=None):
         '''
         Method to calculate and append the path to the goal in the goal queue.
 
         Parameters:
         - cells: 2D NumPy array representing the grid of cells
         - goal: Tuple containing the (row, col) indices of the goal
+        - path_cache: PathCache of the game to search through
+        - scheduler: Optional PathScheduler to queue the search on instead of searching now (default is None)
 
         Returns:
         - None
-        (Modifies the goal queue)
+        (Modifies the goal queue, or sets the path future when a scheduler is used)
         '''
 
-        goals = path_finding.path_find(grid=cells,
-                                       start=(self.grid_row, self.grid_col),
-                                       end=goal)
+        if scheduler is not None:
+            # Enemies closest to their tower are searched for first
+            priority = abs(goal[0] - self.grid_row) + abs(goal[1] - self.grid_col)
+            self.path_future = scheduler.submit(cells,
+                                                start=(self.grid_row, self.grid_col),
+                                                end=goal,
+                                                priority=priority,
+                                                version=Tower.grid_version)
+            self.path_goal = goal
+            return
+
+        goals = path_cache.find(grid=cells,
+                                start=(self.grid_row, self.grid_col),
+                                end=goal,
+                                version=Tower.grid_version)
 
         for goal in goals:
             self.goal_queue.append(goal)
 
     def go_to(self, cells, goal):
         '''
-        Method to update the target position and movement queue for reaching the goal.
+        Method to set the target cell and the per-tick step for reaching the goal.
 
         Parameters:
         - cells: 2D NumPy array representing the grid of cells
@@ -585,7 +594,7 @@ class Enemy(pygame.sprite.Sprite):
 
         Returns:
         - None
-        (Modifies the target position and movement queue)
+        (Modifies the target position and the movement left in the store)
         '''
 
         self.target_grid_row, self.target_grid_col = goal
@@ -594,75 +603,61 @@ class Enemy(pygame.sprite.Sprite):
 
         ticks = int(delta_height * 1 / (2**(self.speed - 1)))
 
-        vector = ((self.target_grid_row - self.grid_row) / ticks,
-                  (self.target_grid_col - self.grid_col) / ticks)
-
-        for tick in range(ticks):
-            self.movement_queue.append(vector)
-
-    def update(self, screen, cells, towers, tower_grid, enemies, scale, offset, paused):
-        '''
-        Method to update the enemy's position, damage cooldown, and drawing.
-
-        Parameters:
-        - screen: Pygame display surface
-        - cells: 2D NumPy array representing the grid of cells
-        - towers: Pygame sprite group containing towers
-        - tower_grid: 2D NumPy array representing the tower grid
-        - enemies: Pygame sprite group containing enemies
-        - scale: Scaling factor for grid cell size
-        - offset: Tuple containing the (x, y) offset of the grid
-        - paused: Boolean indicating whether the game is paused
+        # The store adds the step to the position once per tick until no ticks are left
+        self.step_row = (self.target_grid_row - self.grid_row) / ticks
+        self.step_col = (self.target_grid_col - self.grid_col) / ticks
+        self.ticks_left = ticks
 
-        Returns:
-        - None
-        (Modifies the enemy's position, damage cooldown, and screen)
+    def determine_movement(self, cells, towers, path_cache=None, flow_field=None, scheduler=None):
         '''
+        Method to choose the enemy's next step once it has reached its target cell.
 
-        if not paused:
-            self.determine_movement(cells, towers)
-            self.pos = pygame.Vector2(offset[0] * scale + self.hitbox.x * 5 * scale,
-                                      offset[1] * scale + self.hitbox.y * 5 * scale)
-            self.damage_update(towers, enemies, tower_grid)
-
-        self.draw(screen, scale, offset)
-
-    def determine_movement(self, cells, towers):
-        '''
-        Method to determine the enemy's movement based on the movement and goal queues.
+        Called by the enemies' store for each enemy with no movement left this tick.
 
         Parameters:
         - cells: 2D NumPy array representing the grid of cells
         - towers: Pygame sprite group containing towers
+        - path_cache: PathCache of the game to search through; needed unless a flow field or scheduler is given (default is None)
+        - flow_field: Optional FlowField to read the next step from instead of searching (default is None)
+        - scheduler: Optional PathScheduler to queue path searches on (default is None)
 
         Returns:
         - None
-        (Modifies the enemy's position, hitbox, and may trigger goal navigation)
+        (Modifies the enemy's cell and may trigger goal navigation)
         '''
 
-        self.hitbox = pygame.rect.Rect((self.grid_col, self.grid_row), (5, 5))
+        self.grid_row, self.grid_col = self.target_grid_row, self.target_grid_col
+        self.row, self.col = self.grid_row, self.grid_col  # Settle exactly on the cell
+        self.height = cells[self.grid_row, self.grid_col]
 
-        if self.movement_queue:
-            movement = self.movement_queue.popleft()
-            self.row += movement[0]
-            self.col += movement[1]
+        # Keep the store's spatial hash in step as the enemy changes cell
+        if self.store is not None:
+            self.store.spatial.move(self, self.grid_pos)
 
-        else:
-            self.grid_row, self.grid_col = self.target_grid_row, self.target_grid_col
-            self.grid_pos = self.grid_row, self.grid_col
-            self.height = cells[self.grid_row, self.grid_col]
+        # Collect a scheduled path once it has been found; a search that was cancelled or failed, e.g. because
+        # a worker process died, counts as no path, so the enemy asks again instead of the error ending the game
+        if self.path_future is not None and self.path_future.done():
+            failed = self.path_future.cancelled() or self.path_future.exception() is not None
+            goals = None if failed else self.path_future.result()
+            self.goal_queue.extend(goals or [])
+            self.path_future = None
 
-            self.hitbox = pygame.rect.Rect((self.grid_col, self.grid_row), (5, 5))
+        if self.goal_queue:
+            self.go_to(cells, self.goal_queue.popleft())
 
-            if self.goal_queue:
-                self.go_to(cells, self.goal_queue.popleft())
+        elif flow_field is not None:
+            # Read the next step towards the nearest tower straight from the shared field
+            next_step = flow_field.next_step(self.grid_pos)
+            if next_step:
+                self.go_to(cells, next_step)
 
-            else:
-                goal = self.get_closest_tower_pos(towers)
-                if goal:
-                    self.navigate_to(cells, goal)
+        elif self.path_future is None:
+            # Search for a new path, unless one is already on its way
+            goal = self.get_closest_tower_pos(towers)
+            if goal:
+                self.navigate_to(cells, goal, path_cache, scheduler)
 
-    def draw(self, screen, scale, offset):
+    def draw(self, screen, scale, offset, pos=None):
         '''
         Method to draw the enemy on the screen.
 
@@ -670,28 +665,28 @@ class Enemy(pygame.sprite.Sprite):
         - screen: Pygame display surface
         - scale: Scaling factor for grid cell size
         - offset: Tuple containing the (x, y) offset of the grid
+        - pos: Optional (row, col) in cells to draw at, fractional between logic ticks (default is None, the occupied cell)
 
         Returns:
         - None
         (Modifies the screen)
         '''
-        color = tools.change_hue(gray_color=self.height, 
-                                 new_hue=0)
+        row, col = self.grid_pos if pos is None else pos
+        color = palette.color(self.height, hue=0)
 
         pygame.draw.rect(screen, color,
-             self.hitbox,               # size
-             border_radius=10)  
+             (*tools.grid_to_screen(row, col, scale, offset), 5*scale, 5*scale),  # size
+             border_radius=10)
 
 class Basic(Enemy):
     def __init__(self, Game_Data):
         super().__init__(Game_Data, name="Basic", max_health=3)
 
-    def draw(self, screen, scale, offset):
-        color = tools.change_hue(gray_color=self.height, 
-                                 new_hue=0)
+    def draw(self, screen, scale, offset, pos=None):
+        row, col = self.grid_pos if pos is None else pos
+        color = palette.color(self.height, hue=0)
         
-        rect = pygame.rect.Rect((offset[0]*scale + self.hitbox.x*5*scale, # x
-                                offset[1]*scale + self.hitbox.y*5*scale), # y
+        rect = pygame.rect.Rect(tools.grid_to_screen(row, col, scale, offset),
                                 (5*scale, 5*scale))
         # Flesh
         pygame.draw.rect(screen, color,
@@ -706,12 +701,11 @@ class Runner(Enemy):
         self.level = 1
         self.speed = 1.5
 
-    def draw(self, screen, scale, offset):
-        color = tools.change_hue(gray_color=self.height, 
-                                 new_hue=20)
+    def draw(self, screen, scale, offset, pos=None):
+        row, col = self.grid_pos if pos is None else pos
+        color = palette.color(self.height, hue=20)
         
-        rect = pygame.rect.Rect((offset[0]*scale + (self.hitbox.x + 0.25)*5*scale, # x
-                                 offset[1]*scale + (self.hitbox.y + 0.25)*5*scale), # y
+        rect = pygame.rect.Rect(tools.grid_to_screen(row + 0.25, col + 0.25, scale, offset),
                                 (2.5*scale, 2.5*scale))
         # Flesh
         pygame.draw.rect(screen, color,
@@ -725,12 +719,11 @@ class Giant(Enemy):
                          max_health=20,
                          speed=0.25)
 
-    def draw(self, screen, scale, offset):
-        color = tools.change_hue(gray_color=self.height, 
-                                 new_hue=10)
+    def draw(self, screen, scale, offset, pos=None):
+        row, col = self.grid_pos if pos is None else pos
+        color = palette.color(self.height, hue=10)
         
-        rect = pygame.rect.Rect((offset[0]*scale + (self.hitbox.x - 0.5)*5*scale, # x
-                                 offset[1]*scale + (self.hitbox.y - 0.5)*5*scale), # y
+        rect = pygame.rect.Rect(tools.grid_to_screen(row - 0.5, col - 0.5, scale, offset),
                                 (10*scale, 10*scale))
         # Flesh
         pygame.draw.rect(screen, color,
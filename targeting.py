@@ -0,0 +1,106 @@
+import numpy as np
+
+# Ways a sniper may choose between the enemies in its range
+POLICIES = ("closest", "weakest", "strongest")
+
+def distance_matrix(origins, points):
+    '''
+    Computes the straight-line distance from every origin to every point.
+
+    Parameters:
+    - origins: NumPy array of shape (S, 3) of (row, col, height)
+    - points: NumPy array of shape (N, 3) of (row, col, height)
+
+    Returns:
+    - NumPy array of shape (S, N) of distances
+    '''
+
+    deltas = origins[:, None, :] - points[None, :, :]
+    return np.sqrt((deltas**2).sum(axis=2))
+
+def choose_targets(origins, points, health, policy="closest", max_range=None, chunk_size=2**18):
+    '''
+    Chooses a target point for every origin at once.
+
+    The distance matrix is worked through in blocks of whole rows, so large numbers of towers and
+    enemies never need more than about chunk_size distances in memory at a time.
+
+    Parameters:
+    - origins: NumPy array of shape (S, 3) of the towers' (row, col, height)
+    - points: NumPy array of shape (N, 3) of the enemies' (row, col, height)
+    - health: NumPy array of shape (N,) of the enemies' health
+    - policy: One of POLICIES; "weakest" and "strongest" break ties by distance (default is "closest")
+    - max_range: Optional distance beyond which enemies cannot be targeted (default is None, unlimited)
+    - chunk_size: Number of distances computed per block (default is 2^18)
+
+    Returns:
+    - NumPy integer array of shape (S,) of the chosen point for each origin, or -1 where none is in range
+    '''
+
+    if policy not in POLICIES:
+        raise ValueError(f"policy must be one of {POLICIES}, got {policy!r}")
+
+    choices = np.full(len(origins), -1)
+    if len(origins) == 0 or len(points) == 0:
+        return choices
+
+    rows_per_chunk = max(1, chunk_size // len(points))
+    for start in range(0, len(origins), rows_per_chunk):
+        distances = distance_matrix(origins[start:start + rows_per_chunk], points)
+        if max_range is not None:
+            distances[distances > max_range] = np.inf
+
+        if policy == "closest":
+            scores = distances
+        else:
+            # Rank by health among the enemies in range, then keep only the closest of the best
+            ranking = health if policy == "weakest" else -health
+            ranked = np.where(np.isfinite(distances), ranking, np.inf)
+            scores = np.where(ranked == ranked.min(axis=1, keepdims=True), distances, np.inf)
+
+        best = scores.argmin(axis=1)
+        found = np.isfinite(scores[np.arange(len(best)), best])
+        choices[start:start + len(best)] = np.where(found, best, -1)
+
+    return choices
+
+def assign_targets(towers, enemies, policy="closest", max_range=None):
+    '''
+    Gives every sniper without a live target in range the enemy chosen for it by the policy, in one batched pass.
+
+    Parameters:
+    - towers: Pygame sprite group containing towers
+    - enemies: enemy_store.EnemyStore containing the enemies
+    - policy: One of POLICIES (default is "closest")
+    - max_range: Optional distance in cells, counting height difference, beyond which snipers cannot
+      target enemies (default is None, unlimited)
+
+    Returns:
+    - None
+    (Modifies the snipers' targets)
+    '''
+
+    snipers = [tower for tower in towers if tower.name == "Sniper"]
+
+    # Drop targets that have walked out of range, measuring every held target in one pass
+    if max_range is not None:
+        holding = [sniper for sniper in snipers if sniper.target is not None and sniper.target.alive()]
+        if holding:
+            origins = np.array([(sniper.grid_row, sniper.grid_col, sniper.height) for sniper in holding], dtype=np.float64)
+            rows = [sniper.target.index for sniper in holding]
+            points = np.column_stack((enemies.cell[rows], enemies.height[rows])).astype(np.float64)
+            distances = np.sqrt(((origins - points)**2).sum(axis=1))
+            for sniper, distance in zip(holding, distances):
+                if distance > max_range:
+                    sniper.target = None
+
+    # Targets killed by another tower are no longer in any group, so their snipers look again
+    snipers = [sniper for sniper in snipers if sniper.target is None or not sniper.target.alive()]
+    if not snipers:
+        return
+
+    origins = np.array([(sniper.grid_row, sniper.grid_col, sniper.height) for sniper in snipers], dtype=np.float64)
+    points = np.column_stack((enemies.cell, enemies.height)).astype(np.float64)
+
+    for sniper, choice in zip(snipers, choose_targets(origins, points, enemies.health, policy, max_range)):
+        sniper.target = None if choice < 0 else enemies.enemies[choice]
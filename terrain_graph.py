@@ -0,0 +1,148 @@
+import numpy as np
+
+# Movement directions in the same order as get_neighbors: down, up, right, left
+DIRECTIONS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+
+def compute_costs(grid):
+    '''
+    Computes the cost of every step on the terrain grid with vectorized NumPy.
+
+    Parameters:
+    - grid: 2D NumPy array representing the terrain heights
+
+    Returns:
+    - Tuple (costs, reverse_costs) of arrays with shape (4, rows * cols); costs[d][node] is the cost of
+      leaving node in direction d and reverse_costs[d][node] the cost of arriving at node from that direction
+    '''
+
+    rows, cols = grid.shape
+    heights = np.asarray(grid, dtype=float)
+
+    # costs[d][node] is the cost of leaving node in direction d (infinity where it would leave the grid)
+    costs = np.full((4, rows, cols), np.inf)
+    costs[0, :-1, :] = np.maximum(heights[1:, :] - heights[:-1, :], 10)  # down
+    costs[1, 1:, :] = np.maximum(heights[:-1, :] - heights[1:, :], 10)   # up
+    costs[2, :, :-1] = np.maximum(heights[:, 1:] - heights[:, :-1], 10)  # right
+    costs[3, :, 1:] = np.maximum(heights[:, :-1] - heights[:, 1:], 10)   # left
+
+    # The reverse of leaving node in direction d is arriving from that neighbor in the opposite direction
+    reverse_costs = np.full((4, rows, cols), np.inf)
+    reverse_costs[0, :-1, :] = costs[1, 1:, :]
+    reverse_costs[1, 1:, :] = costs[0, :-1, :]
+    reverse_costs[2, :, :-1] = costs[3, :, 1:]
+    reverse_costs[3, :, 1:] = costs[2, :, :-1]
+
+    return costs.reshape(4, rows * cols), reverse_costs.reshape(4, rows * cols)
+
+class TerrainGraph:
+    '''
+    Class representing the terrain grid as a directed graph with precomputed edge costs.
+
+    Nodes are flat integer ids (row * cols + col). Edge costs follow the pathfinding rule
+    max(change, 10) and are computed once with vectorized NumPy, then stored both as four
+    direction cost arrays and as a CSR adjacency (indptr, indices, weights) for the search loops.
+    '''
+
+    def __init__(self, grid, costs=None):
+        '''
+        Constructor to initialize a TerrainGraph object.
+
+        Parameters:
+        - grid: 2D NumPy array representing the terrain heights
+        - costs: Optional tuple (costs, reverse_costs) of previously computed edge-cost arrays, as stored
+          by terrain_store, to skip recomputing them (default is None)
+        '''
+
+        self.grid = grid
+        self.rows, self.cols = grid.shape
+        self.size = self.rows * self.cols
+        self.offsets = tuple(d_row * self.cols + d_col for d_row, d_col in DIRECTIONS)
+
+        if costs is not None:
+            self.costs, self.reverse_costs = (np.asarray(array, dtype=float).reshape(4, self.size) for array in costs)
+        else:
+            self.costs, self.reverse_costs = compute_costs(grid)
+
+        # Build the CSR adjacency, neighbors of each node listed in direction order
+        valid = np.isfinite(self.costs).T
+        node_ids = np.arange(self.size)
+        self.indptr = np.concatenate(([0], np.cumsum(valid.sum(axis=1))))
+        self.indices = (node_ids[:, None] + np.array(self.offsets)[None, :])[valid]
+        self.weights = self.costs.T[valid]
+        self.reverse_weights = self.reverse_costs.T[valid]
+
+        # Plain Python lists are much faster than NumPy scalars inside the search loops
+        self.indptr_list = self.indptr.tolist()
+        self.indices_list = self.indices.tolist()
+        self.weights_list = self.weights.tolist()
+        self.reverse_weights_list = self.reverse_weights.tolist()
+
+    def node_id(self, node):
+        '''
+        Method to convert a (row, col) tuple into a flat node id.
+
+        Parameters:
+        - node: A tuple (row, col) representing the cell
+
+        Returns:
+        - Integer node id
+        '''
+
+        return int(node[0]) * self.cols + int(node[1])
+
+    def node(self, node_id):
+        '''
+        Method to convert a flat node id back into a (row, col) tuple.
+
+        Parameters:
+        - node_id: Integer node id
+
+        Returns:
+        - A tuple (row, col) representing the cell
+        '''
+
+        return divmod(node_id, self.cols)
+
+_current_grid = None  # Grid the objects in _derived were built for
+_derived = {}  # Map the name of each kind of object derived from the current grid, e.g. "graph", to it
+
+def derived(grid, name, build):
+    '''
+    Returns an object derived from a grid, building it only the first time it is asked for on that grid.
+
+    Only the objects of the latest grid are kept: a new map replaces the graph, landmarks and cluster
+    hierarchy of the previous one all at once.
+
+    Parameters:
+    - grid: 2D NumPy array representing the terrain heights
+    - name: String naming the kind of object, e.g. "graph"
+    - build: Function taking no arguments that builds the object
+
+    Returns:
+    - The object built for the grid
+    '''
+
+    global _current_grid
+
+    if grid is not _current_grid:
+        _current_grid = grid
+        _derived.clear()
+
+    if name not in _derived:
+        _derived[name] = build()
+
+    return _derived[name]
+
+def get_graph(grid, costs=None):
+    '''
+    Returns the TerrainGraph for a grid, building it only the first time that grid is seen.
+
+    Parameters:
+    - grid: 2D NumPy array representing the terrain heights
+    - costs: Optional tuple (costs, reverse_costs) of stored edge-cost arrays to build from (default is None)
+
+    Returns:
+    - TerrainGraph built from the grid
+    '''
+
+    return derived(grid, "graph", lambda: TerrainGraph(grid, costs))
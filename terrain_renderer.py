@@ -0,0 +1,238 @@
+import pygame
+import numpy as np
+from collections import OrderedDict
+
+import palette
+import tools
+
+class TerrainRenderer:
+    '''
+    Class that draws the terrain from cached, pre-scaled surfaces instead of one rect per cell.
+
+    The map is split into square tiles whose colors are written into a surface with surfarray, one
+    pixel per cell. Each tile is scaled to a zoom level the first time it is drawn at it and kept,
+    so a frame is a few blits, and only the tiles on screen are ever scaled. Tiles hold fewer cells
+    the further the view is zoomed in, so no scaled tile is much larger than the screen.
+    '''
+
+    def __init__(self, cells, colors=None, hue=145, size=5, max_pixels=2**24, tile_cells=64, tile_pixels=1024):
+        '''
+        Constructor to initialize a TerrainRenderer object.
+
+        Parameters:
+        - cells: 2D NumPy array (or chunked terrain) of gray values (0 to 255)
+        - colors: Optional NumPy uint8 array of shape (rows, cols, 3) with the cell colors, as stored by
+          terrain_store; built from the cells if not given (default is None)
+        - hue: Hue in degrees applied to the terrain (default is 145)
+        - size: Size of each grid cell before scaling (default is 5)
+        - max_pixels: Total pixels of scaled surfaces kept before the least recently used are dropped (default is 2^24)
+        - tile_cells: Most cells along each side of a tile (default is 64)
+        - tile_pixels: Tiles are halved until their side is at most this many pixels at the zoom level (default is 1024)
+        '''
+
+        self.cells = cells
+        self.hue = hue
+        self.size = size
+        self.max_pixels = max_pixels
+        self.tile_cells = tile_cells
+        self.tile_pixels = tile_pixels
+
+        # Dense maps are colored once up front; chunked maps are colored a tile at a time as tiles are drawn
+        self.chunked = hasattr(cells, "chunk_size")
+        if self.chunked:
+            self.colors = None
+        else:
+            self.colors = self.colorize(cells) if colors is None else np.asarray(colors)
+
+        self.surfaces = OrderedDict()  # Map (tile row, tile col, scale) to a scaled surface, least recently used first
+        self.pixels = 0  # Total pixels of the surfaces held
+
+    def colorize(self, block):
+        '''
+        Method to convert a block of gray values into RGB colors.
+
+        Parameters:
+        - block: 2D NumPy array of gray values
+
+        Returns:
+        - NumPy uint8 array of shape (rows, cols, 3)
+        '''
+
+        return palette.colors(block, self.hue)
+
+    def tile_size(self, scale):
+        '''
+        Method to get the number of cells along each side of a tile at a zoom level.
+
+        Parameters:
+        - scale: Scaling factor for grid cell size
+
+        Returns:
+        - Integer number of cells, a power of two fraction of tile_cells
+        '''
+
+        cells = self.tile_cells
+        while cells > 1 and cells * self.size * scale > self.tile_pixels:
+            cells //= 2
+        return cells
+
+    def tile_colors(self, tile_row, tile_col, tile_size):
+        '''
+        Method to get the colors of one tile.
+
+        Parameters:
+        - tile_row: Integer tile row
+        - tile_col: Integer tile col
+        - tile_size: Number of cells along each side of a tile
+
+        Returns:
+        - NumPy uint8 array of shape (rows, cols, 3), smaller than a whole tile at the map's edges
+        '''
+
+        top, left = tile_row * tile_size, tile_col * tile_size
+        bottom, right = min(top + tile_size, self.cells.shape[0]), min(left + tile_size, self.cells.shape[1])
+
+        if self.colors is not None:
+            return self.colors[top:bottom, left:right]
+        return self.colorize(self.cells.region(top, bottom, left, right))
+
+    def pixel(self, cell, scale):
+        '''
+        Method to get the pixel distance of a cell boundary from the map's top-left corner.
+
+        Rounding each boundary, rather than each cell's size, keeps neighbouring tiles flush at any scale.
+
+        Parameters:
+        - cell: Integer row or col of the boundary
+        - scale: Scaling factor for grid cell size
+
+        Returns:
+        - Integer number of pixels
+        '''
+
+        return round(cell * self.size * scale)
+
+    def get_surface(self, tile_row, tile_col, scale, cache=True):
+        '''
+        Method to get a tile's surface at a zoom level, rendering it the first time.
+
+        Parameters:
+        - tile_row: Integer tile row
+        - tile_col: Integer tile col
+        - scale: Scaling factor for grid cell size
+        - cache: Boolean indicating whether to keep a newly rendered surface, False for scales only
+          passed through while zooming (default is True)
+
+        Returns:
+        - Pygame Surface of the tile at the given scale
+        '''
+
+        # The tile size follows from the scale, so the scale alone tells tilings apart
+        key = (tile_row, tile_col, scale)
+        if key in self.surfaces:
+            self.surfaces.move_to_end(key)
+            return self.surfaces[key]
+
+        # surfarray indexes pixels as (x, y), so the (row, col) color array is transposed
+        tile_size = self.tile_size(scale)
+        colors = self.tile_colors(tile_row, tile_col, tile_size)
+        surface = pygame.surfarray.make_surface(colors.transpose(1, 0, 2))
+
+        rows, cols = colors.shape[:2]
+        top, left = tile_row * tile_size, tile_col * tile_size
+        width = self.pixel(left + cols, scale) - self.pixel(left, scale)
+        height = self.pixel(top + rows, scale) - self.pixel(top, scale)
+        width, height = max(1, width), max(1, height)
+        surface = pygame.transform.scale(surface, (width, height))
+
+        if not cache:
+            return surface
+
+        self.surfaces[key] = surface
+        self.pixels += width * height
+
+        # Bound the cache by memory rather than count, since tiles are smaller the further the view is zoomed in
+        while self.pixels > self.max_pixels:
+            _, dropped = self.surfaces.popitem(last=False)
+            self.pixels -= dropped.get_width() * dropped.get_height()
+
+        return surface
+
+    def invalidate(self):
+        '''
+        Method to drop every rendered surface, for when the terrain itself changes.
+
+        Returns:
+        - None
+        '''
+
+        self.surfaces.clear()
+        self.pixels = 0
+        if not self.chunked:
+            self.colors = self.colorize(self.cells)
+
+    def draw_cursor_lines(self, screen, scale, offset, cursor_xy, visible):
+        '''
+        Method to desaturate the row and column of cells under the cursor by 90, on top of the cached terrain.
+
+        Parameters:
+        - screen: Pygame display surface on which the lines will be drawn
+        - scale: Scaling factor for grid cell size
+        - offset: Tuple containing the (x, y) offset of the grid
+        - cursor_xy: Tuple containing the row and column indices of the cursor position
+        - visible: Tuple (row_start, row_end, col_start, col_end) of the visible cells
+
+        Returns:
+        - None
+        '''
+
+        row, col = cursor_xy
+        row_start, row_end, col_start, col_end = visible
+        origin_x, origin_y = round(offset[0] * scale), round(offset[1] * scale)
+
+        for cells, (x, y) in ((self.cells[row:row + 1, col_start:col_end], (col_start, row)),
+                              (self.cells[row_start:row_end, col:col + 1], (col, row_start))):
+            colors = palette.colors(cells, self.hue, desaturation=90)
+
+            surface = pygame.surfarray.make_surface(colors.transpose(1, 0, 2))
+            width = self.pixel(x + cells.shape[1], scale) - self.pixel(x, scale)
+            height = self.pixel(y + cells.shape[0], scale) - self.pixel(y, scale)
+            surface = pygame.transform.scale(surface, (max(1, width), max(1, height)))
+            screen.blit(surface, (origin_x + self.pixel(x, scale), origin_y + self.pixel(y, scale)))
+
+    def draw(self, screen, scale, offset, cursor_xy=None, visible=None, cache=True):
+        '''
+        Method to draw the terrain, blitting the cached surface of every tile on screen.
+
+        Parameters:
+        - screen: Pygame display surface on which the terrain will be drawn
+        - scale: Scaling factor for grid cell size
+        - offset: Tuple containing the (x, y) offset of the grid
+        - cursor_xy: Optional tuple with the row and column under the cursor, whose row and column
+          are desaturated (default is None)
+        - visible: Optional tuple (row_start, row_end, col_start, col_end) of the visible cells, as worked
+          out once per frame by viewport.Camera (default is None, which works it out from the screen size)
+        - cache: Boolean indicating whether to keep the tiles rendered at this scale; pass False while a zoom
+          is under way, so the scales it passes through are not all kept (default is True)
+
+        Returns:
+        - None
+        '''
+
+        if visible is None:
+            visible = tools.visible_cells(self.cells.shape, scale, offset, screen.get_size(), self.size)
+        row_start, row_end, col_start, col_end = visible
+        if row_start >= row_end or col_start >= col_end:
+            return
+
+        tile_size = self.tile_size(scale)
+        origin_x, origin_y = round(offset[0] * scale), round(offset[1] * scale)
+
+        for tile_row in range(row_start // tile_size, (row_end - 1) // tile_size + 1):
+            for tile_col in range(col_start // tile_size, (col_end - 1) // tile_size + 1):
+                surface = self.get_surface(tile_row, tile_col, scale, cache)
+                screen.blit(surface, (origin_x + self.pixel(tile_col * tile_size, scale),
+                                      origin_y + self.pixel(tile_row * tile_size, scale)))
+
+        if cursor_xy:
+            self.draw_cursor_lines(screen, scale, offset, cursor_xy, visible)
@@ -0,0 +1,220 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+import generate_terrain as gt
+import generate_caves
+import palette
+import terrain_graph
+
+# Map generator names to (generate function, module whose GENERATOR_VERSION covers it)
+GENERATORS = {
+    "diamond_square": (gt.generate_terrain, gt),  # Rolling hills
+    "caves": (generate_caves.cave_terrain, generate_caves)  # Cellular-automaton caves
+}
+
+class TerrainStore:
+    '''
+    Class representing an on-disk cache of generated terrain and the artifacts derived from it.
+
+    Each entry is a directory named after a hash of the generation parameters and the generator's
+    version, holding the height grid and colorized cells as .npy files and the edge-cost arrays as an
+    .npz file. Large arrays are memory-mapped on load, so starting on a cached map costs almost nothing.
+    When the store grows past its size cap the least recently used entries are deleted.
+    '''
+
+    def __init__(self, directory, max_bytes=64 * 2**20, mmap_bytes=2**20):
+        '''
+        Constructor to initialize a TerrainStore object.
+
+        Parameters:
+        - directory: Path of the directory entries are kept in (created if missing)
+        - max_bytes: Total size in bytes the store may use before evicting entries (default is 64 MiB)
+        - mmap_bytes: Arrays at least this many bytes are memory-mapped instead of read (default is 1 MiB)
+        '''
+
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.mmap_bytes = mmap_bytes
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, **params):
+        '''
+        Method to compute the cache key for a set of generation parameters.
+
+        Parameters:
+        - **params: Keyword arguments passed to build_terrain
+
+        Returns:
+        - String hex digest identifying the parameters and generator version
+        '''
+
+        _, module = GENERATORS[params.get("generator", "diamond_square")]
+        description = json.dumps({"version": module.GENERATOR_VERSION, "params": params}, sort_keys=True)
+        return hashlib.sha1(description.encode()).hexdigest()
+
+    def load_array(self, path):
+        '''
+        Method to load one stored .npy array, memory-mapping it if it is large.
+
+        Parameters:
+        - path: Path of the .npy file
+
+        Returns:
+        - Read-only NumPy array
+        '''
+
+        mmap_mode = "r" if os.path.getsize(path) >= self.mmap_bytes else None
+        array = np.load(path, mmap_mode=mmap_mode)
+
+        # Hand out a plain ndarray view so the memmap subclass does not leak into arrays derived from it
+        array = array.view(np.ndarray)
+        array.flags.writeable = False
+        return array
+
+    def load(self, **params):
+        '''
+        Method to load a stored terrain.
+
+        Parameters:
+        - **params: Keyword arguments that were passed to build_terrain
+
+        Returns:
+        - Dictionary with "grid", "colors", "costs" and "reverse_costs" arrays, or None if not stored
+        '''
+
+        entry = os.path.join(self.directory, self.key(**params))
+        if not os.path.isdir(entry):
+            return None
+
+        try:
+            terrain = {"grid": self.load_array(os.path.join(entry, "grid.npy")),
+                       "colors": self.load_array(os.path.join(entry, "colors.npy"))}
+            with np.load(os.path.join(entry, "edges.npz")) as edges:
+                terrain["costs"], terrain["reverse_costs"] = edges["costs"], edges["reverse_costs"]
+        except (OSError, ValueError, KeyError):
+            return None  # Incomplete or corrupt entry; it is regenerated and overwritten
+
+        os.utime(entry)  # Mark the entry as recently used
+        return terrain
+
+    def save(self, terrain, **params):
+        '''
+        Method to store a terrain, then evict old entries if the store is over its size cap.
+
+        Parameters:
+        - terrain: Dictionary with "grid", "colors", "costs" and "reverse_costs" arrays
+        - **params: Keyword arguments that were passed to build_terrain
+
+        Returns:
+        - None
+        '''
+
+        entry = os.path.join(self.directory, self.key(**params))
+
+        # Write into a temporary directory and rename it into place, so a half-written entry is never loaded
+        staging = tempfile.mkdtemp(dir=self.directory, prefix=".staging-")
+        try:
+            np.save(os.path.join(staging, "grid.npy"), terrain["grid"])
+            np.save(os.path.join(staging, "colors.npy"), terrain["colors"])
+            np.savez(os.path.join(staging, "edges.npz"),
+                     costs=terrain["costs"], reverse_costs=terrain["reverse_costs"])
+
+            shutil.rmtree(entry, ignore_errors=True)
+            os.replace(staging, entry)
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        self.evict(keep=entry)
+
+    def entry_size(self, entry):
+        '''
+        Method to get the total size of the files in one entry.
+
+        Parameters:
+        - entry: Path of the entry directory
+
+        Returns:
+        - Integer size in bytes
+        '''
+
+        return sum(os.path.getsize(os.path.join(entry, name)) for name in os.listdir(entry))
+
+    def evict(self, keep=None):
+        '''
+        Method to delete least recently used entries until the store fits within its size cap.
+
+        Parameters:
+        - keep: Optional path of an entry that must not be evicted (default is None)
+
+        Returns:
+        - None
+        '''
+
+        entries = [os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                   if not name.startswith(".")]
+        entries.sort(key=os.path.getmtime)  # Least recently used first
+
+        total = sum(self.entry_size(entry) for entry in entries)
+        for entry in entries:
+            if total <= self.max_bytes:
+                break
+            if entry != keep:
+                total -= self.entry_size(entry)
+                shutil.rmtree(entry, ignore_errors=True)
+
+    def get_terrain(self, **params):
+        '''
+        Method to load a terrain from the store, generating and storing it the first time.
+
+        Parameters:
+        - **params: Keyword arguments passed to build_terrain
+
+        Returns:
+        - Dictionary with "grid", "colors", "costs" and "reverse_costs" arrays
+        '''
+
+        terrain = self.load(**params)
+        if terrain is None:
+            terrain = build_terrain(**params)
+            self.save(terrain, **params)
+
+        return terrain
+
+def colorize(grid, hue=145):
+    '''
+    Converts a grid of gray values into RGB colors with the terrain's hue.
+
+    Parameters:
+    - grid: 2D NumPy array of gray values (0 to 255)
+    - hue: Hue in degrees applied to every cell (default is 145)
+
+    Returns:
+    - NumPy uint8 array of shape (rows, cols, 3)
+    '''
+
+    return palette.colors(grid, hue)
+
+def build_terrain(generator="diamond_square", **params):
+    '''
+    Generates a terrain and the artifacts derived from it.
+
+    Parameters:
+    - generator: Name of the generator in GENERATORS to use (default is "diamond_square")
+    - **params: Keyword arguments passed to the generator
+
+    Returns:
+    - Dictionary with "grid", "colors", "costs" and "reverse_costs" arrays
+    '''
+
+    generate, _ = GENERATORS[generator]
+    grid = generate(**params)
+    costs, reverse_costs = terrain_graph.compute_costs(grid)
+
+    return {"grid": grid, "colors": colorize(grid), "costs": costs, "reverse_costs": reverse_costs}
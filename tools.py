@@ -1,9 +1,12 @@
 import pygame
 import numpy as np
-import colorsys
 import math
 import os
 import json
+from collections import OrderedDict
+
+# The color conversions live in palette; re-exported here for existing callers
+from palette import change_hue, desaturate_color
 
 pygame.init()
 
@@ -97,124 +100,114 @@ def float_to_color(value):
     return max(0, min(normalized_value, 255))
 
 
-def change_hue(gray_color, new_hue):
+def float_array_to_color(values):
     '''
-    Function to change the hue of a gray color.
+    Function to convert an array of floating-point values to color intensities within the range [0, 255].
 
     Parameters:
-    - gray_color: Integer representing the gray color value (0 to 255)
-    - new_hue: New hue value in degrees (0 to 360)
+    - values: NumPy array of floating-point values to be converted
 
     Returns:
-    - Tuple containing the RGB color after changing the hue
+    - NumPy float array of color intensities within the range [0, 255], matching float_to_color per element
     '''
 
-    # Convert HSV to RGB, considering the input gray_color as the value component
-    new_rgb = colorsys.hsv_to_rgb(new_hue / 360, 1, gray_color / 255)
-
-    # Convert the resulting floating-point RGB values back to integers in the range [0, 255]
-    return tuple(int(x * 255) for x in new_rgb)
+    # Normalize to [0, 255]; astype(int) truncates towards zero like int() in float_to_color
+    normalized_values = ((values + 1) * 127.5).astype(int)
 
+    # Ensure the results are within the valid range of [0, 255]
+    return np.clip(normalized_values, 0, 255).astype(float)
 
-def desaturate_color(color, amount):
+def visible_cells(shape, scale, offset, view_size, size=5):
     '''
-    Function to desaturate an RGB color by a specified amount.
+    Function to get the block of grid cells that overlaps the screen.
 
     Parameters:
-    - color: Tuple representing the RGB color to be desaturated
-    - amount: Integer value indicating the amount of desaturation (0 to 255)
+    - shape: Tuple (rows, cols) of the grid
+    - scale: Scaling factor for grid cell size
+    - offset: Tuple containing the (x, y) offset of the grid
+    - view_size: Tuple (width, height) of the screen in pixels
+    - size: Size of each grid cell (default is 5)
 
     Returns:
-    - Tuple containing the desaturated RGB color
+    - Tuple (row_start, row_end, col_start, col_end) of the visible cells, end indices exclusive
     '''
 
-    # Ensure the amount is within the valid range of 0 to 255
-    amount = max(0, min(amount, 255))
-
-    # Convert the RGB color to HLS color space
-    r, g, b = color
-    h, l, s = colorsys.rgb_to_hls(r / 255.0, g / 255.0, b / 255.0)
-
-    # Desaturate the color by adjusting its saturation
-    new_s = max(0, s - (amount / 255.0))
-    
-    # Convert the color back to RGB
-    new_r, new_g, new_b = colorsys.hls_to_rgb(h, l, new_s)
+    rows, cols = shape
+    cell_size = size * scale
+    if cell_size <= 0:
+        return 0, rows, 0, cols
 
-    # Convert back to integer RGB values
-    new_r = int(new_r * 255)
-    new_g = int(new_g * 255)
-    new_b = int(new_b * 255)
+    # Invert x = offset * scale + col * cell_size for both screen edges, with a cell of margin for rounding
+    col_start = max(0, math.floor(-offset[0] * scale / cell_size) - 1)
+    col_end = min(cols, math.ceil((view_size[0] - offset[0] * scale) / cell_size) + 1)
+    row_start = max(0, math.floor(-offset[1] * scale / cell_size) - 1)
+    row_end = min(rows, math.ceil((view_size[1] - offset[1] * scale) / cell_size) + 1)
 
-    # Return the desaturated RGB color
-    return new_r, new_g, new_b
+    return row_start, max(row_start, row_end), col_start, max(col_start, col_end)
 
 
-def draw_grid(screen, cells, scale, offset):
+def grid_to_screen(row, col, scale, offset, size=5):
     '''
-    Function to draw a grid on a Pygame screen based on a 2D array of cells.
+    Function to get the screen position of a grid cell's top-left corner.
 
     Parameters:
-    - screen: Pygame display surface on which the grid will be drawn
-    - cells: 2D NumPy array representing the grid with color values for each cell
+    - row: Row of the cell (may be fractional)
+    - col: Column of the cell (may be fractional)
     - scale: Scaling factor for grid cell size
     - offset: Tuple containing the (x, y) offset of the grid
+    - size: Size of each grid cell (default is 5)
 
     Returns:
-    - None
-    (Modifies the screen directly to draw the grid)
+    - Tuple (x, y) of the position in pixels
     '''
 
-    # Get the row and column indices of the cursor position
-    cursor_xy = get_cursor_xy(cells, scale, offset)
+    return offset[0] * scale + col * size * scale, offset[1] * scale + row * size * scale
 
-    # Iterate through each cell in the grid using NumPy ndindex
-    for row, col in np.ndindex(cells.shape):
-        # Change the hue of the cell's color based on its value
-        color = change_hue(gray_color=cells[row][col], new_hue=145)
-        size = 5
+def screen_to_grid(pos, scale, offset, size=5):
+    '''
+    Function to get the grid cell containing a screen position, inverting grid_to_screen.
 
-        # If the cursor is over a cell, desaturate its color by 90%
-        if cursor_xy:
-            if row == cursor_xy[0] or col == cursor_xy[1]:
-                color = desaturate_color(color, 90)
+    Parameters:
+    - pos: Tuple (x, y) of the position in pixels
+    - scale: Scaling factor for grid cell size
+    - offset: Tuple containing the (x, y) offset of the grid
+    - size: Size of each grid cell (default is 5)
 
-        # Draw a rectangle representing the current grid cell on the Pygame screen
-        pygame.draw.rect(screen, color,
-                         (offset[0] * scale + col * size * scale, offset[1] * scale + row * size * scale,
-                          size * scale, size * scale),
-                         border_radius=1)
+    Returns:
+    - Tuple (row, col) of the cell, which may lie outside the grid
+    '''
 
+    cell_size = size * scale
+    return (math.floor((pos[1] - offset[1] * scale) / cell_size),
+            math.floor((pos[0] - offset[0] * scale) / cell_size))
 
-def get_cursor_xy(cells, scale, offset, size=5):
+def get_cursor_xy(cells, scale, offset, size=5, mouse_pos=None):
     '''
     Function to get the row and column indices of a 2D grid corresponding to the cursor position.
 
     Parameters:
-    - cells: 2D NumPy array representing the grid
+    - cells: 2D NumPy array (or chunked terrain) representing the grid
     - scale: Scaling factor for grid cell size
     - offset: Tuple containing the (x, y) offset of the grid
     - size: Size of each grid cell (default is 5)
+    - mouse_pos: Optional tuple (x, y) to look up instead of the current mouse position (default is None)
 
     Returns:
     - Tuple containing the row and column indices of the cursor position in the grid
     - Returns None if the cursor is not over any grid cell
     '''
 
-    # Get the current mouse position
-    mouse_pos = pygame.mouse.get_pos()
+    if scale <= 0:
+        return None
 
-    # Iterate through each cell in the grid using NumPy ndindex
-    for row, col in np.ndindex(cells.shape):
-        # Create a Rect object representing the current grid cell
-        rect = pygame.rect.Rect(offset[0] * scale + col * size * scale,
-                                offset[1] * scale + row * size * scale,
-                                size * scale, size * scale)
+    # Get the current mouse position
+    if mouse_pos is None:
+        mouse_pos = pygame.mouse.get_pos()
 
-        # Check if the mouse position is within the current grid cell
-        if rect.collidepoint(mouse_pos):
-            # Return the row and column indices of the cursor position
-            return row, col
+    # Work out the cell directly rather than testing every cell's rect; only the shape is read
+    row, col = screen_to_grid(mouse_pos, scale, offset, size)
+    if 0 <= row < cells.shape[0] and 0 <= col < cells.shape[1]:
+        return row, col
 
     # Return None if the cursor is not over any grid cell
     return None
@@ -331,12 +324,108 @@ def rotate_point_around_pivot_simple(pivot_point: pygame.Vector2, distance_from_
     rotated_offset = pygame.Vector2(math.cos(angle), math.sin(angle)) * distance_from_pivot
     return pivot_point + rotated_offset
 
+class RotationCache:
+    '''
+    Cache class to store solid-colored shapes and their rotations, so rotating sprites do not build and
+    rotate new surfaces every frame.
+
+    Shapes are keyed by pixel size, which follows the zoom level, and color. Rotations are keyed by
+    shape and angle rounded to a fixed number of steps. Both are evicted least recently used first;
+    rotations once their total pixels pass a limit, since each zoom level fills the cache with larger ones.
+
+    Attributes:
+    - shapes: OrderedDict mapping (width, height, color) to a shape surface.
+    - rotations: OrderedDict mapping (shape key, angle step) to a rotated surface.
+    '''
+
+    def __init__(self, steps=360, max_shapes=256, max_pixels=2**22):
+        '''
+        Constructor to initialize a RotationCache object.
+
+        Parameters:
+        - steps: Number of angles a full turn is rounded to (default is 360)
+        - max_shapes: Number of shapes kept before the least recently used are dropped (default is 256)
+        - max_pixels: Total pixels of rotated surfaces kept before the least recently used are dropped (default is 2^22)
+        '''
+
+        self.steps = steps
+        self.max_shapes = max_shapes
+        self.max_pixels = max_pixels
+
+        self.shapes = OrderedDict()
+        self.rotations = OrderedDict()
+        self.pixels = 0  # Total pixels of the rotated surfaces held
+        self.keys = {}  # Map id(shape surface) to its key, so cached shapes are recognised when rotated
+
+    def get_shape(self, size, color):
+        '''
+        Get a cached solid rectangle surface or create and cache a new one if not present.
+
+        Parameters:
+        - size: Tuple (width, height) in pixels; fractions are truncated as pygame.Surface does
+        - color: Tuple (r, g, b) fill color
+
+        Returns:
+        - Pygame Surface filled with the color; it is shared, so it must not be drawn on
+        '''
+
+        key = (int(size[0]), int(size[1]), tuple(color))
+        if key in self.shapes:
+            self.shapes.move_to_end(key)
+            return self.shapes[key]
+
+        image = pygame.Surface(key[:2], pygame.SRCALPHA)
+        image.fill(color)
+        self.shapes[key] = image
+        self.keys[id(image)] = key
+
+        while len(self.shapes) > self.max_shapes:
+            _, dropped = self.shapes.popitem(last=False)
+            del self.keys[id(dropped)]
+
+        return image
+
+    def get_rotated(self, image, degrees):
+        '''
+        Get an image rotated anticlockwise, from the cache if the image is a cached shape.
+
+        Parameters:
+        - image: Pygame Surface to rotate
+        - degrees: Angle in degrees, rounded to the nearest step when the image is a cached shape
+
+        Returns:
+        - Rotated Pygame Surface
+        '''
+
+        shape_key = self.keys.get(id(image))
+        if shape_key is None:
+            return pygame.transform.rotate(image, degrees)
+
+        step = round(degrees * self.steps / 360) % self.steps
+        key = (shape_key, step)
+        if key in self.rotations:
+            self.rotations.move_to_end(key)
+            return self.rotations[key]
+
+        rotated = pygame.transform.rotate(image, step * 360 / self.steps)
+        self.rotations[key] = rotated
+        self.pixels += rotated.get_width() * rotated.get_height()
+
+        while self.pixels > self.max_pixels:
+            _, dropped = self.rotations.popitem(last=False)
+            self.pixels -= dropped.get_width() * dropped.get_height()
+
+        return rotated
+
+# Shared by every rotating sprite; shapes taken from it are rotated from the cache by rotate_image_around_pivot
+rotation_cache = RotationCache()
+
 def rotate_image_around_pivot(image: pygame.Surface, pivot_point: pygame.Vector2, distance_from_pivot: pygame.Vector2, angle: float) -> tuple[pygame.Surface, pygame.Rect]:
     """
     Moves the image and rotates it such that the center tracks around the pivot point. Returns the image and a rect,
-    which can be used directly with pygame.Surface.blit
+    which can be used directly with pygame.Surface.blit. Images from rotation_cache.get_shape are rotated from the cache
     """
-    new_img = pygame.transform.rotate(image, math.degrees(-angle))
+    new_img = rotation_cache.get_rotated(image, math.degrees(-angle))
     new_origin = rotate_point_around_pivot_simple(pivot_point, distance_from_pivot, angle)
     new_rect = new_img.get_rect(center=new_origin)
 
@@ -0,0 +1,109 @@
+import settings
+import tools
+
+class Camera:
+    '''
+    Class representing the part of the map shown on screen for one frame.
+
+    Built each frame from the offset, scale and screen resolution, it works out the visible block of
+    cells and the cell under the cursor once so terrain drawing can slice just that window, sprites off
+    screen can skip drawing, and everything placing or highlighting by cursor shares one lookup.
+    '''
+
+    def __init__(self, offset, scale, resolution=None, size=5, margin=2):
+        '''
+        Constructor to initialize a Camera object.
+
+        Parameters:
+        - offset: Tuple containing the (x, y) offset of the grid
+        - scale: Scaling factor for grid cell size
+        - resolution: Tuple (width, height) of the screen in pixels (default is None, which uses settings.resolution)
+        - size: Size of each grid cell before scaling (default is 5)
+        - margin: Cells beyond the screen edge a sprite may reach and still count as visible, e.g. a
+          sniper's turret (default is 2)
+        '''
+
+        self.offset = offset
+        self.scale = scale
+        self.resolution = settings.resolution if resolution is None else resolution
+        self.size = size
+        self.margin = margin
+        self.visible = None  # (row_start, row_end, col_start, col_end), set by look_at
+        self.cursor = None  # (row, col) under the mouse, or None if off the grid, set by look_at
+
+    def look_at(self, cells, mouse_pos=None):
+        '''
+        Method to work out which cells of a grid are on screen, and which is under the cursor, this frame.
+
+        Parameters:
+        - cells: 2D NumPy array (or chunked terrain) representing the grid; only its shape is read
+        - mouse_pos: Optional tuple (x, y) to use instead of the current mouse position (default is None)
+
+        Returns:
+        - Tuple (row_start, row_end, col_start, col_end) of the visible cells, end indices exclusive
+        '''
+
+        self.visible = tools.visible_cells(cells.shape, self.scale, self.offset, self.resolution, self.size)
+        self.cursor = tools.get_cursor_xy(cells, self.scale, self.offset, self.size, mouse_pos)
+        return self.visible
+
+    def to_screen(self, row, col):
+        '''
+        Method to get the screen position of a grid cell's top-left corner.
+
+        Parameters:
+        - row: Row of the cell (may be fractional)
+        - col: Column of the cell (may be fractional)
+
+        Returns:
+        - Tuple (x, y) of the position in pixels
+        '''
+
+        return tools.grid_to_screen(row, col, self.scale, self.offset, self.size)
+
+    def to_grid(self, pos):
+        '''
+        Method to get the grid cell containing a screen position.
+
+        Parameters:
+        - pos: Tuple (x, y) of the position in pixels
+
+        Returns:
+        - Tuple (row, col) of the cell, which may lie outside the grid
+        '''
+
+        return tools.screen_to_grid(pos, self.scale, self.offset, self.size)
+
+    def can_see(self, row, col, rows=1, cols=1):
+        '''
+        Method to check whether a block of cells overlaps the screen, allowing for the margin.
+
+        Parameters:
+        - row: Row of the block's top-left cell (may be fractional for moving sprites)
+        - col: Col of the block's top-left cell
+        - rows: Number of rows the block covers (default is 1)
+        - cols: Number of cols the block covers (default is 1)
+
+        Returns:
+        - True if any part of the block is visible, False otherwise
+        '''
+
+        row_start, row_end, col_start, col_end = self.visible
+        return (row + rows + self.margin > row_start and row - self.margin < row_end and
+                col + cols + self.margin > col_start and col - self.margin < col_end)
+
+    def can_see_all(self, rows, cols):
+        '''
+        Method to check many single cells against the screen at once, allowing for the margin.
+
+        Parameters:
+        - rows: NumPy array of cell rows
+        - cols: NumPy array of cell cols
+
+        Returns:
+        - Boolean NumPy array, True where the cell is visible
+        '''
+
+        row_start, row_end, col_start, col_end = self.visible
+        return ((rows + 1 + self.margin > row_start) & (rows - self.margin < row_end) &
+                (cols + 1 + self.margin > col_start) & (cols - self.margin < col_end))